@@ -0,0 +1,40 @@
+"""add partial unique index on appointments (clinic_id, appointment_datetime) for active bookings
+
+Revision ID: 1c9d5e3a8b27
+Revises: 7b1e4d9c2f60
+Create Date: 2026-10-16 22:48:51.276630
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c9d5e3a8b27'
+down_revision: Union[str, None] = '7b1e4d9c2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # A clinic holds one active appointment per start time, across all staff and Calendly event types.
+    # Fails if a clinic already has two active bookings in the same slot; those must be resolved first.
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ux_appt_slot',
+            'appointments',
+            ['clinic_id', 'appointment_datetime'],
+            unique=True,
+            postgresql_where=sa.text("status IN ('SCHEDULED', 'CONFIRMED')"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ux_appt_slot', table_name='appointments', postgresql_concurrently=True)
@@ -0,0 +1,28 @@
+"""add clinic google_calendar_sync_token
+
+Revision ID: 4f2a8c6e1d95
+Revises: 1c9d5e3a8b27
+Create Date: 2026-10-17 09:14:22.650381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f2a8c6e1d95'
+down_revision: Union[str, None] = '1c9d5e3a8b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('clinics', sa.Column('google_calendar_sync_token', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('clinics', 'google_calendar_sync_token')
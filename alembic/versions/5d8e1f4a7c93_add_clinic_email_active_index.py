@@ -0,0 +1,38 @@
+"""add partial clinics (email) index for active clinic logins
+
+Revision ID: 5d8e1f4a7c93
+Revises: e3a7c5b90d12
+Create Date: 2026-10-16 21:03:52.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8e1f4a7c93'
+down_revision: Union[str, None] = 'e3a7c5b90d12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_clinic_email_active',
+            'clinics',
+            ['email'],
+            unique=False,
+            postgresql_where=sa.text('is_active = true'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_clinic_email_active', table_name='clinics', postgresql_concurrently=True)
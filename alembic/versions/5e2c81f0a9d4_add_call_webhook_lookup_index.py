@@ -0,0 +1,49 @@
+"""add call webhook lookup index and normalized from_number
+
+Revision ID: 5e2c81f0a9d4
+Revises: a847f83813cf
+Create Date: 2026-10-16 09:12:44.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2c81f0a9d4'
+down_revision: Union[str, None] = 'a847f83813cf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('calls', sa.Column('from_number_e164', sa.String(length=20), nullable=True))
+    op.execute("UPDATE calls SET from_number_e164 = ltrim(from_number, '+')")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_call_webhook_lookup',
+            'calls',
+            ['clinic_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_where=sa.text('conversation_id IS NULL'),
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            op.f('ix_clinics_elevenlabs_agent_id'),
+            'clinics',
+            ['elevenlabs_agent_id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_clinics_elevenlabs_agent_id'), table_name='clinics', postgresql_concurrently=True)
+        op.drop_index('idx_call_webhook_lookup', table_name='calls', postgresql_concurrently=True)
+    op.drop_column('calls', 'from_number_e164')
@@ -0,0 +1,37 @@
+"""add appointments (clinic_id, appointment_datetime, status) index for slot lookups
+
+Revision ID: 7b1e4d9c2f60
+Revises: a2c6f0e9b314
+Create Date: 2026-10-16 22:05:37.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1e4d9c2f60'
+down_revision: Union[str, None] = 'a2c6f0e9b314'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_appt_clinic_dt_status',
+            'appointments',
+            ['clinic_id', 'appointment_datetime', 'status'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_appt_clinic_dt_status', table_name='appointments', postgresql_concurrently=True)
@@ -0,0 +1,40 @@
+"""normalize calls.from_number_e164 to digits and index it
+
+Revision ID: 7b3d9e2a4c61
+Revises: 5e2c81f0a9d4
+Create Date: 2026-10-16 18:40:12.502913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3d9e2a4c61'
+down_revision: Union[str, None] = '5e2c81f0a9d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("UPDATE calls SET from_number_e164 = regexp_replace(from_number, '[^0-9]', '', 'g')")
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_call_from_e164',
+            'calls',
+            ['clinic_id', 'from_number_e164'],
+            unique=False,
+            postgresql_where=sa.text('conversation_id IS NULL'),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_call_from_e164', table_name='calls', postgresql_concurrently=True)
+    op.execute("UPDATE calls SET from_number_e164 = ltrim(from_number, '+')")
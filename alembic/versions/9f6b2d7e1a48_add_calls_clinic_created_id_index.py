@@ -0,0 +1,37 @@
+"""add calls (clinic_id, created_at, id) index for keyset pagination
+
+Revision ID: 9f6b2d7e1a48
+Revises: c4a1e8f27d35
+Create Date: 2026-10-16 19:42:08.119356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f6b2d7e1a48'
+down_revision: Union[str, None] = 'c4a1e8f27d35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_calls_clinic_created_id',
+            'calls',
+            ['clinic_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_calls_clinic_created_id', table_name='calls', postgresql_concurrently=True)
@@ -0,0 +1,30 @@
+"""widen clinics.email_verification_code to hold an OTP hash
+
+Revision ID: a2c6f0e9b314
+Revises: 5d8e1f4a7c93
+Create Date: 2026-10-16 21:20:14.583906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2c6f0e9b314'
+down_revision: Union[str, None] = '5d8e1f4a7c93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('clinics', 'email_verification_code', type_=sa.String(length=64), existing_type=sa.String(length=10), existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Pending hashed codes do not fit the old width; they are cleared and must be reissued
+    op.execute("UPDATE clinics SET email_verification_code = NULL WHERE length(email_verification_code) > 10")
+    op.alter_column('clinics', 'email_verification_code', type_=sa.String(length=10), existing_type=sa.String(length=64), existing_nullable=True)
@@ -0,0 +1,38 @@
+"""store call and analytics scores as float
+
+Revision ID: c4a1e8f27d35
+Revises: 7b3d9e2a4c61
+Create Date: 2026-10-16 19:05:31.774420
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a1e8f27d35'
+down_revision: Union[str, None] = '7b3d9e2a4c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('calls', 'confidence_score', type_=sa.Float(), existing_type=sa.Numeric(precision=3, scale=2), existing_nullable=True)
+    op.alter_column('calls', 'call_quality_score', type_=sa.Float(), existing_type=sa.Numeric(precision=3, scale=2), existing_nullable=True)
+    op.alter_column('call_analytics', 'sentiment_score', type_=sa.Float(), existing_type=sa.Numeric(precision=3, scale=2), existing_nullable=True)
+    op.alter_column('call_analytics', 'response_time_avg', type_=sa.Float(), existing_type=sa.Numeric(precision=5, scale=2), existing_nullable=True)
+    op.alter_column('call_analytics', 'understanding_score', type_=sa.Float(), existing_type=sa.Numeric(precision=3, scale=2), existing_nullable=True)
+    op.alter_column('call_analytics', 'resolution_score', type_=sa.Float(), existing_type=sa.Numeric(precision=3, scale=2), existing_nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column('call_analytics', 'resolution_score', type_=sa.Numeric(precision=3, scale=2), existing_type=sa.Float(), existing_nullable=True)
+    op.alter_column('call_analytics', 'understanding_score', type_=sa.Numeric(precision=3, scale=2), existing_type=sa.Float(), existing_nullable=True)
+    op.alter_column('call_analytics', 'response_time_avg', type_=sa.Numeric(precision=5, scale=2), existing_type=sa.Float(), existing_nullable=True)
+    op.alter_column('call_analytics', 'sentiment_score', type_=sa.Numeric(precision=3, scale=2), existing_type=sa.Float(), existing_nullable=True)
+    op.alter_column('calls', 'call_quality_score', type_=sa.Numeric(precision=3, scale=2), existing_type=sa.Float(), existing_nullable=True)
+    op.alter_column('calls', 'confidence_score', type_=sa.Numeric(precision=3, scale=2), existing_type=sa.Float(), existing_nullable=True)
@@ -0,0 +1,28 @@
+"""add clinic elevenlabs_phone_id
+
+Revision ID: e3a7c5b90d12
+Revises: 9f6b2d7e1a48
+Create Date: 2026-10-16 20:11:47.302918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3a7c5b90d12'
+down_revision: Union[str, None] = '9f6b2d7e1a48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('clinics', sa.Column('elevenlabs_phone_id', sa.String(length=100), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('clinics', 'elevenlabs_phone_id')
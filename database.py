@@ -3,8 +3,10 @@ from sqlalchemy import create_engine, MetaData
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 import logging
-from typing import Generator
+from functools import lru_cache
+from typing import AsyncGenerator, Generator
 from sqlalchemy.orm import Session
 
 # Configure logging
@@ -235,6 +237,37 @@ def get_db():
     finally:
         db.close()
 
+@lru_cache(maxsize=1)
+def get_async_engine():
+    """
+    Async engine (asyncpg) for handlers that must not block the event loop.
+    Created lazily and shared for the life of the process.
+    """
+    async_url = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return create_async_engine(async_url, pool_size=20, max_overflow=10)
+
+@lru_cache(maxsize=1)
+def get_async_sessionmaker() -> async_sessionmaker:
+    """Session factory bound to the shared async engine"""
+    return async_sessionmaker(get_async_engine(), expire_on_commit=False)
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    FastAPI dependency yielding an AsyncSession.
+    Use this in async route handlers so DB round-trips don't block the loop:
+    
+    @app.post("/webhook")
+    async def webhook(db: AsyncSession = Depends(get_async_db)):
+        result = await db.execute(select(Item))
+    """
+    async with get_async_sessionmaker()() as db:
+        try:
+            yield db
+        except Exception as e:
+            logger.error(f"Async database dependency error: {e}")
+            await db.rollback()
+            raise
+
 # Database initialization function
 def init_database():
     """
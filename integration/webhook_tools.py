@@ -771,7 +771,7 @@ async def webhook_register_patient(request: RegisterPatientRequest) -> Dict[str,
 async def athena_book_appointment(request: BookAppointmentRequest) -> Dict[str, Any]:
     """Handle Athena Health appointment booking"""
     # Log the incoming request
-    print(f"Book appointment request: {request.dict()}")
+    print(f"Book appointment request: {request.model_dump()}")
     
     # If no appointment_id provided, we'll need to get it from availability check
     if not request.appointment_id and request.date and request.time:
@@ -1,12 +1,18 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Optional
 from fastapi import FastAPI
+import httpx
 import uvicorn
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from fastapi import Request, Form
 import logging
 from fastapi.middleware.cors import CORSMiddleware
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
 from dotenv import load_dotenv
+import os
 
 # Load environment variables from .env file
 load_dotenv()
@@ -21,7 +27,7 @@ logger = logging.getLogger(__name__)
 # Import routes
 
 from routes.appointments import router as calender_router
-from routes.auth import router as clinic_router
+from routes.auth import router as clinic_router, limiter
 from routes.agent_setup_routes import router as agent_setup_router
 from routes.webhook_generator_routes import router as webhook_gen_router
 from routes.webhook_tools_routes import router as webhook_tools_router
@@ -29,12 +35,48 @@ from routes.conversation_routes import router as conversation_router
 from routes.admin_routes import router as admin_router
 #from routes.elevenlabs_webhook_routes import router as elevenlabs_webhook_router
 
+from services.cache_service import cache_service
+from services.conversation_service import conversation_service
+from services.agent_setup_service import agent_setup_service
+from services.calender_service import calendar_service
+from schemas import warm_schemas
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers and release shared clients on shutdown"""
+    # Build deferred response schemas now instead of on their first request
+    warm_schemas()
+    # One pooled client for all upstream ElevenLabs calls
+    app.state.http = httpx.AsyncClient(
+        timeout=httpx.Timeout(10.0, connect=2.0),
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+        http2=True
+    )
+    conversation_service.set_http_client(app.state.http)
+    sync_worker = asyncio.create_task(conversation_service.run_sync_worker())
+    phone_map_refresh = asyncio.create_task(agent_setup_service.run_phone_map_refresh())
+    google_calendar_pull = asyncio.create_task(calendar_service.run_google_calendar_pull())
+    connection_warm_up = asyncio.create_task(asyncio.to_thread(agent_setup_service.warm_connection))
+    yield
+    sync_worker.cancel()
+    phone_map_refresh.cancel()
+    google_calendar_pull.cancel()
+    await cache_service.close()
+    await conversation_service.aclose()
+    await app.state.http.aclose()
+    agent_setup_service.close()
+    await agent_setup_service.aclose()
+
 # Initialize FastAPI app
 app = FastAPI(
+    lifespan=lifespan,
     title="Clinic AI Assistant",
     description="AI-powered clinic management system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -53,6 +95,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Largest webhook payload accepted (ElevenLabs call-ended bodies embed transcripts)
+WEBHOOK_MAX_BODY_BYTES = int(os.getenv("WEBHOOK_MAX_BODY_BYTES", str(5 * 1024 * 1024)))
+WEBHOOK_PATH_PREFIXES = ("/webhooks/", "/api/tools/")
+
+@app.middleware("http")
+async def limit_webhook_body_size(request: Request, call_next):
+    """Reject oversized webhook bodies from Content-Length before any bytes are buffered"""
+    if request.url.path.startswith(WEBHOOK_PATH_PREFIXES):
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > WEBHOOK_MAX_BODY_BYTES:
+            return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
+
 # Include routers
 #app.include_router(calender_router, prefix="/Calender", tags=["calender"])
 app.include_router(clinic_router, prefix="/clinic",tags=["clinic-registration"])
@@ -139,4 +194,5 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # httptools + uvloop avoid the pure-Python h11/asyncio body accumulation path
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, loop="uvloop", http="httptools")
\ No newline at end of file
@@ -1,12 +1,19 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, JSON, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Numeric, Float, JSON, Enum, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, Session
+from sqlalchemy.orm import relationship, Session, validates
 from sqlalchemy.sql import func
 from datetime import datetime
 import enum
+import re
 
 Base = declarative_base()
 
+_NON_DIGIT = re.compile(r"\D")
+
+def normalize_phone_key(value):
+    """Lookup key stored in Call.from_number_e164: the digits of a raw phone number"""
+    return _NON_DIGIT.sub("", value) if value else None
+
 # Enums for status fields
 class AppointmentStatus(enum.Enum):
     SCHEDULED = "scheduled"
@@ -69,9 +76,13 @@ class Clinic(Base):
     
     # Integration settings
     calendar_integration = Column(JSON, nullable=True)  # Google Calendar, etc.
+    google_calendar_sync_token = Column(Text, nullable=True)  # nextSyncToken of the last Google Calendar pull
     twilio_phone_sid = Column(String(100), nullable=True)
     twilio_phone_number = Column(String(20), nullable=True)  # The actual phone number
-    elevenlabs_agent_id = Column(String(100), nullable=True)  # ElevenLabs agent ID
+    elevenlabs_phone_id = Column(String(100), nullable=True)  # ElevenLabs ID of the imported Twilio number
+    # ElevenLabs agent ID; webhooks resolve the clinic by this value, so it is
+    # indexed and expected to be unique per clinic
+    elevenlabs_agent_id = Column(String(100), nullable=True, index=True)
     elevenlabs_agent_name = Column(String(255), nullable=True)  # ElevenLabs agent name
     knowledge_base_id = Column(Text, nullable=True) 
     setup_results = Column(JSON, nullable=True)  # Store setup results for debugging
@@ -91,7 +102,7 @@ class Clinic(Base):
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Email verification fields
-    email_verification_code = Column(String(10), nullable=True)
+    email_verification_code = Column(String(64), nullable=True)  # HMAC-SHA256 hex of the OTP
     email_verified = Column(Boolean, default=False)
     
     # Relationships
@@ -101,6 +112,11 @@ class Clinic(Base):
     calls = relationship("Call", back_populates="clinic")
     knowledge_base = relationship("KnowledgeBase", back_populates="clinic")
     insurance_plans = relationship("InsurancePlan", back_populates="clinic")
+    
+    __table_args__ = (
+        # Serves the login lookup of an active clinic by email
+        Index("ix_clinic_email_active", email, postgresql_where=is_active == True),
+    )
 
 
 class Patient(Base):
@@ -221,6 +237,21 @@ class Appointment(Base):
     staff_member = relationship("Staff", back_populates="appointments")
     calls = relationship("Call", back_populates="appointment")
     original_appointment = relationship("Appointment", remote_side=[id])
+    
+    __table_args__ = (
+        # Serves the per-day and upcoming range scans of a clinic's active appointments
+        Index("ix_appt_clinic_dt_status", clinic_id, appointment_datetime, status),
+        # At most one active booking per clinic start time, whichever staff member or Calendly
+        # event type it is for; a double booking fails on insert. staff_id is left out of the
+        # key because booking paths leave it NULL, and NULLs never collide in a unique index
+        Index(
+            "ux_appt_slot",
+            clinic_id,
+            appointment_datetime,
+            unique=True,
+            postgresql_where=status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
+        ),
+    )
 
 
 class Call(Base):
@@ -235,6 +266,9 @@ class Call(Base):
     twilio_call_sid = Column(String(100), nullable=True, unique=True)
     from_number = Column(String(20), nullable=False)
     to_number = Column(String(20), nullable=False)
+    # Digits of from_number, kept in sync by _normalize_from_number
+    # so webhook lookups can use an equality match instead of LIKE '%...%'
+    from_number_e164 = Column(String(20), nullable=True)
     
     # ElevenLabs conversation ID
     conversation_id = Column(String(100), nullable=True, unique=True, index=True)
@@ -248,7 +282,7 @@ class Call(Base):
     transcript = Column(Text, nullable=True)
     ai_summary = Column(Text, nullable=True)
     intent_detected = Column(String(100), nullable=True)  # appointment, question, complaint
-    confidence_score = Column(Numeric(3, 2), nullable=True)  # 0.00 to 1.00
+    confidence_score = Column(Float, nullable=True)  # 0.00 to 1.00
     
     # Call outcome
     outcome = Column(String(100), nullable=True)  # scheduled, rescheduled, cancelled, info_provided
@@ -257,7 +291,7 @@ class Call(Base):
     
     # Quality metrics
     patient_satisfaction = Column(Integer, nullable=True)  # 1-5 rating
-    call_quality_score = Column(Numeric(3, 2), nullable=True)
+    call_quality_score = Column(Float, nullable=True)
     
     # Audio and recording
     recording_url = Column(String(500), nullable=True)
@@ -273,6 +307,30 @@ class Call(Base):
     clinic = relationship("Clinic", back_populates="calls")
     patient = relationship("Patient", back_populates="calls")
     appointment = relationship("Appointment", back_populates="calls")
+    
+    __table_args__ = (
+        # Serves the ElevenLabs webhook lookup of the latest pending call per clinic
+        Index(
+            "idx_call_webhook_lookup",
+            clinic_id,
+            created_at.desc(),
+            postgresql_where=conversation_id.is_(None)
+        ),
+        # Serves keyset pagination of a clinic's calls, newest first
+        Index("ix_calls_clinic_created_id", clinic_id, created_at, id),
+        # Serves the equality match on the caller's normalized number
+        Index(
+            "idx_call_from_e164",
+            clinic_id,
+            from_number_e164,
+            postgresql_where=conversation_id.is_(None)
+        ),
+    )
+    
+    @validates("from_number")
+    def _normalize_from_number(self, key, value):
+        self.from_number_e164 = normalize_phone_key(value)
+        return value
 
 
 class KnowledgeBase(Base):
@@ -344,15 +402,15 @@ class CallAnalytics(Base):
     call_id = Column(Integer, ForeignKey("calls.id"), nullable=False)
     
     # Conversation analysis
-    sentiment_score = Column(Numeric(3, 2), nullable=True)  # -1.00 to 1.00
+    sentiment_score = Column(Float, nullable=True)  # -1.00 to 1.00
     emotion_detected = Column(String(50), nullable=True)  # happy, frustrated, neutral
     key_phrases = Column(JSON, nullable=True)
     topics_discussed = Column(JSON, nullable=True)
     
     # Performance metrics
-    response_time_avg = Column(Numeric(5, 2), nullable=True)  # Average AI response time
-    understanding_score = Column(Numeric(3, 2), nullable=True)  # How well AI understood
-    resolution_score = Column(Numeric(3, 2), nullable=True)  # How well issue was resolved
+    response_time_avg = Column(Float, nullable=True)  # Average AI response time
+    understanding_score = Column(Float, nullable=True)  # How well AI understood
+    resolution_score = Column(Float, nullable=True)  # How well issue was resolved
     
     # Business metrics
     conversion_achieved = Column(Boolean, default=False)  # Did we achieve the goal?
@@ -3,6 +3,7 @@ Agent Setup Routes for Clinic AI Assistant
 Handles ElevenLabs agent management and outbound call endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile, Body, Request, Depends
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -19,7 +20,7 @@ from sqlalchemy.orm import Session
 
 from database import get_db
 from services.agent_setup_service import agent_setup_service
-from routes.auth import get_current_user, get_current_clinic
+from routes.auth import get_current_user, get_current_clinic, require_clinic
 from models import CallType, CallStatus, Clinic, Call, KnowledgeBase
 import requests
 from routes.webhook_generator_routes import router as webhook_gen_router
@@ -94,11 +95,16 @@ class CallStatusResponse(BaseModel):
     handoff_to_human: bool
     patient_satisfaction: Optional[int]
 
+class CallListCursor(BaseModel):
+    before_created_at: datetime
+    before_id: int
+
 class CallListResponse(BaseModel):
     calls: List[CallStatusResponse]
     total_count: int
     limit: int
     offset: int
+    next_cursor: Optional[CallListCursor] = None
 
 class KnowledgeBaseTextRequest(BaseModel):
     text: str = Field(..., description="Text content to add to the knowledge base")
@@ -195,42 +201,12 @@ async def create_agent_for_clinic(
 @router.get("/clinic/{clinic_id}/twilio-number", response_model=TwilioNumberResponse)
 async def get_clinic_twilio_number(
     clinic_id: int,
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    clinic: Clinic = Depends(require_clinic)
 ):
     """
     Get the Twilio phone number for a clinic
     - **clinic_id**: ID of the clinic
     """
-    # Check if user has access to this clinic
-    if current_user.get("user_type") == "clinic":
-        if current_user.get("user_id") != clinic_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this clinic"
-            )
-    elif current_user.get("user_type") == "staff":
-        # Staff members can access their clinic's Twilio number
-        staff_clinic_id = current_user.get("clinic_id")
-        if staff_clinic_id != clinic_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this clinic"
-            )
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid user type"
-        )
-    
-    # Get clinic information
-    clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
-    if not clinic:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Clinic not found"
-        )
-    
     return TwilioNumberResponse(
         clinic_id=clinic.id,
         clinic_name=clinic.name,
@@ -371,23 +347,24 @@ async def get_call_status(
             detail="Call not found"
         )
     
-    # Check if user has access to this call's clinic
-    call = db.query(Call).filter(Call.id == call_id).first()
-    if not call:
+    # Check if user has access to this call's clinic; only clinic_id is read,
+    # so no Call entity (or its lazy relationships) is loaded
+    call_clinic_id = db.query(Call.clinic_id).filter(Call.id == call_id).scalar()
+    if call_clinic_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Call not found"
         )
     
     if current_user.get("user_type") == "clinic":
-        if current_user.get("user_id") != call.clinic_id:
+        if current_user.get("user_id") != call_clinic_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied to this call"
             )
     elif current_user.get("user_type") == "staff":
         staff_clinic_id = current_user.get("clinic_id")
-        if staff_clinic_id != call.clinic_id:
+        if staff_clinic_id != call_clinic_id:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied to this call"
@@ -404,9 +381,11 @@ async def get_call_status(
 async def list_clinic_calls(
     clinic_id: int,
     limit: int = Query(50, ge=1, le=100, description="Maximum number of calls to return"),
-    offset: int = Query(0, ge=0, description="Number of calls to skip"),
+    offset: int = Query(0, ge=0, description="Number of calls to skip (ignored when a cursor is given)"),
     call_type: Optional[CallType] = Query(None, description="Filter by call type"),
     status: Optional[CallStatus] = Query(None, description="Filter by call status"),
+    before_created_at: Optional[datetime] = Query(None, description="Cursor: created_at from next_cursor"),
+    before_id: Optional[int] = Query(None, description="Cursor: id from next_cursor"),
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -417,6 +396,7 @@ async def list_clinic_calls(
     - **offset**: Number of calls to skip
     - **call_type**: Optional filter by call type
     - **status**: Optional filter by call status
+    - **before_created_at** / **before_id**: Cursor from the previous page's next_cursor
     """
     # Check if user has access to this clinic
     if current_user.get("user_type") == "clinic":
@@ -444,7 +424,9 @@ async def list_clinic_calls(
         limit=limit,
         offset=offset,
         call_type=call_type,
-        status=status
+        status=status,
+        before_created_at=before_created_at,
+        before_id=before_id
     )
     
     # Get total count for pagination
@@ -459,7 +441,11 @@ async def list_clinic_calls(
         calls=[CallStatusResponse(**call) for call in calls],
         total_count=total_count,
         limit=limit,
-        offset=offset
+        offset=offset,
+        next_cursor=(
+            CallListCursor(before_created_at=calls[-1]["created_at"], before_id=calls[-1]["call_id"])
+            if len(calls) == limit else None
+        )
     )
 
 @router.patch("/clinic/{clinic_id}/agent-config/full")
@@ -480,7 +466,7 @@ async def update_full_agent_config(
     agent_info = agent_setup_service.get_clinic_agent_info(db, clinic_id)
     if not agent_info:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Agent not found for this clinic")
-    result = agent_setup_service.update_agent_full_config(agent_info['agent_id'], config)
+    result = await asyncio.to_thread(agent_setup_service.update_agent_full_config, agent_info['agent_id'], config)
     if 'error' in result:
         raise HTTPException(status_code=500, detail=result['error'])
     return result
@@ -489,60 +475,38 @@ async def update_full_agent_config(
 @router.get("/clinic/{clinic_id}/setup-status")
 async def get_clinic_setup_status(
     clinic_id: int,
-    current_user: Dict[str, Any] = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    clinic: Clinic = Depends(require_clinic)
 ):
     """
     Get the setup status for a clinic's agent
     - **clinic_id**: ID of the clinic
     """
-    # Check if user has access to this clinic
-    if current_user.get("user_type") == "clinic":
-        if current_user.get("user_id") != clinic_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this clinic"
-            )
-    elif current_user.get("user_type") == "staff":
-        staff_clinic_id = current_user.get("clinic_id")
-        if staff_clinic_id != clinic_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Access denied to this clinic"
-            )
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Invalid user type"
-        )
-    
-    clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
-    if not clinic:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Clinic not found"
-        )
+    # Read each column once; several are reused for the *_configured flags
+    tw_num, tw_sid, el_id, el_name, voice_id, kb_id = (
+        clinic.twilio_phone_number,
+        clinic.twilio_phone_sid,
+        clinic.elevenlabs_agent_id,
+        clinic.elevenlabs_agent_name,
+        clinic.ai_voice_id,
+        clinic.knowledge_base_id,
+    )
     
     return {
         "clinic_id": clinic.id,
         "clinic_name": clinic.name,
-        "agent_configured": bool(clinic.elevenlabs_agent_id),
-        "agent_id": clinic.elevenlabs_agent_id,
-        "agent_name": clinic.elevenlabs_agent_name,
-        "twilio_configured": bool(clinic.twilio_phone_number),
-        "twilio_phone_number": clinic.twilio_phone_number,
-        "twilio_phone_sid": clinic.twilio_phone_sid,
-        "ai_voice_configured": bool(clinic.ai_voice_id),
-        "ai_voice_id": clinic.ai_voice_id,
+        "agent_configured": bool(el_id),
+        "agent_id": el_id,
+        "agent_name": el_name,
+        "twilio_configured": bool(tw_num),
+        "twilio_phone_number": tw_num,
+        "twilio_phone_sid": tw_sid,
+        "ai_voice_configured": bool(voice_id),
+        "ai_voice_id": voice_id,
         "ai_personality_configured": bool(clinic.ai_personality),
         "greeting_message_configured": bool(clinic.greeting_message),
-        "knowledge_base_configured": bool(clinic.knowledge_base_id),
-        "knowledge_base_id": clinic.knowledge_base_id,
-        "ready_for_outbound_calls": bool(
-            clinic.elevenlabs_agent_id and 
-            clinic.twilio_phone_number and 
-            clinic.ai_voice_id
-        )
+        "knowledge_base_configured": bool(kb_id),
+        "knowledge_base_id": kb_id,
+        "ready_for_outbound_calls": bool(el_id and tw_num and voice_id)
     }
 
 # Knowledge Base Routes
@@ -619,8 +583,15 @@ async def import_phone_number_to_elevenlabs(
             detail="Failed to import phone number to ElevenLabs"
         )
     
-    # If the clinic has an agent, try to link the phone number to it
+    # If this is the clinic's number, store its ElevenLabs ID so outbound
+    # calls don't have to look it up
     clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
+    if clinic and clinic.twilio_phone_number == request.phone_number:
+        clinic.elevenlabs_phone_id = phone_id
+        db.commit()
+        agent_setup_service.invalidate_clinic(clinic_id)
+    
+    # If the clinic has an agent, try to link the phone number to it
     if clinic and clinic.elevenlabs_agent_id:
         linked = await agent_setup_service.link_phone_to_agent(
             agent_id=clinic.elevenlabs_agent_id,
@@ -768,7 +739,7 @@ async def assign_phone_to_agent(
     phone_id = await agent_setup_service._get_elevenlabs_phone_id(clinic.twilio_phone_number)
     if not phone_id:
         raise HTTPException(status_code=404, detail="Phone number not found in ElevenLabs")
-    success = agent_setup_service.assign_phone_to_agent(clinic.elevenlabs_agent_id, phone_id)
+    success = await asyncio.to_thread(agent_setup_service.assign_phone_to_agent, clinic.elevenlabs_agent_id, phone_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to assign phone number to agent")
     return {"success": True, "agent_id": clinic.elevenlabs_agent_id, "phone_number_id": phone_id}
@@ -799,7 +770,7 @@ async def assign_my_clinic_phone_to_agent(
     phone_id = await agent_setup_service._get_elevenlabs_phone_id(clinic.twilio_phone_number)
     if not phone_id:
         raise HTTPException(status_code=404, detail="Phone number not found in ElevenLabs")
-    success = agent_setup_service.assign_phone_to_agent(clinic.elevenlabs_agent_id, phone_id)
+    success = await asyncio.to_thread(agent_setup_service.assign_phone_to_agent, clinic.elevenlabs_agent_id, phone_id)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to assign phone number to agent")
     return {"success": True, "agent_id": clinic.elevenlabs_agent_id, "phone_number_id": phone_id} 
@@ -2,14 +2,20 @@
 Authentication Routes for Clinic AI Assistant
 Handles login, registration, token validation, and access control
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from datetime import timedelta
+import orjson
+from cachetools import TTLCache
+from slowapi import Limiter
+from slowapi.util import get_remote_address
 
-from database import get_db
+from database import get_db, SessionLocal
 from services.auth_service import auth_service
 from models import Clinic, Staff, Admin
 from enum import Enum
@@ -17,8 +23,19 @@ from enum import Enum
 # Import StaffRole enum - adjust import based on your models file structure
 from models import StaffRole
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 security = HTTPBearer()
+limiter = Limiter(key_func=get_remote_address)
+
+# Token response constants, computed once at import
+_ACCESS_TOKEN_EXPIRE_SECONDS = auth_service.access_token_expire_minutes * 60
+_BEARER = "bearer"
+
+# Rows fetched per round-trip when streaming the clinic list
+_CLINIC_STREAM_BATCH = 500
+
+# Source IPs that attempted a login in the last 200ms
+_recent_login_ips = TTLCache(maxsize=10000, ttl=0.2)
 
 # Pydantic models for request/response
 class ClinicLoginRequest(BaseModel):
@@ -67,8 +84,7 @@ class ClinicResponse(BaseModel):
     address: Optional[str] = None
     is_active: bool
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class VerifyClinicEmailRequest(BaseModel):
     clinic_id: int
@@ -114,6 +130,25 @@ def require_clinic_access(current_user: Dict[str, Any], clinic_id: int, db: Sess
             detail="Access denied to this clinic"
         )
 
+def require_clinic(
+    clinic_id: int,
+    current_user: Dict[str, Any] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> Clinic:
+    """
+    Dependency that checks access to the clinic in the path and returns it
+    The clinic is loaded once and stays in the session identity map for the rest of the request
+    """
+    require_clinic_access(current_user, clinic_id, db)
+    
+    clinic = db.get(Clinic, clinic_id)
+    if not clinic:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Clinic not found"
+        )
+    return clinic
+
 def get_current_clinic(
     current_user: Dict[str, Any] = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -133,9 +168,25 @@ def get_current_clinic(
         )
     return clinic
 
+async def throttle_login(request: Request):
+    """
+    Dependency that rejects back-to-back login attempts from the same IP
+    Runs before authentication so spray traffic never reaches bcrypt.
+    Async so the unlocked TTLCache is only touched from the event loop thread
+    """
+    client_ip = request.client.host if request.client else "unknown"
+    if client_ip in _recent_login_ips:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts. Please slow down."
+        )
+    _recent_login_ips[client_ip] = True
+
 # Routes
-@router.post("/login/clinic", response_model=TokenResponse)
+@router.post("/login/clinic", response_model=TokenResponse, dependencies=[Depends(throttle_login)])
+@limiter.limit("10/minute")
 async def login_clinic(
+    request: Request,
     login_data: ClinicLoginRequest,
     db: Session = Depends(get_db)
 ):
@@ -156,13 +207,15 @@ async def login_clinic(
     
     return TokenResponse(
         access_token=access_token,
-        token_type="bearer",
+        token_type=_BEARER,
         user_type="clinic",
-        expires_in=auth_service.access_token_expire_minutes * 60
+        expires_in=_ACCESS_TOKEN_EXPIRE_SECONDS
     )
 
 @router.post("/register/clinic", response_model=ClinicResponse)
+@limiter.limit("5/minute")
 async def register_clinic(
+    request: Request,
     registration_data: RegisterClinicRequest,
     db: Session = Depends(get_db)
 ):
@@ -175,7 +228,7 @@ async def register_clinic(
     - **website**: Optional clinic website URL
     - **address**: Optional clinic address
     """
-    clinic_data = registration_data.dict(exclude={"password"})
+    clinic_data = registration_data.model_dump(exclude={"password"})
     
     try:
         clinic = auth_service.register_clinic(db, clinic_data, registration_data.password)
@@ -197,7 +250,9 @@ async def register_clinic(
         )
 
 @router.post("/register/admin", response_model=TokenResponse)
+@limiter.limit("5/minute")
 async def register_admin(
+    request: Request,
     registration_data: AdminRegisterRequest,
     db: Session = Depends(get_db)
 ):
@@ -211,9 +266,9 @@ async def register_admin(
         access_token = auth_service.create_admin_token(admin)
         return TokenResponse(
             access_token=access_token,
-            token_type="bearer",
+            token_type=_BEARER,
             user_type="admin",
-            expires_in=auth_service.access_token_expire_minutes * 60
+            expires_in=_ACCESS_TOKEN_EXPIRE_SECONDS
         )
     except HTTPException:
         raise
@@ -223,8 +278,10 @@ async def register_admin(
             detail=f"Admin registration failed: {str(e)}"
         )
 
-@router.post("/login/admin", response_model=TokenResponse)
+@router.post("/login/admin", response_model=TokenResponse, dependencies=[Depends(throttle_login)])
+@limiter.limit("10/minute")
 async def login_admin(
+    request: Request,
     login_data: AdminLoginRequest,
     db: Session = Depends(get_db)
 ):
@@ -243,9 +300,9 @@ async def login_admin(
     access_token = auth_service.create_admin_token(admin)
     return TokenResponse(
         access_token=access_token,
-        token_type="bearer",
+        token_type=_BEARER,
         user_type="admin",
-        expires_in=auth_service.access_token_expire_minutes * 60
+        expires_in=_ACCESS_TOKEN_EXPIRE_SECONDS
     )
 
 @router.get("/me")
@@ -370,22 +427,38 @@ async def verify_clinic_email(
         raise HTTPException(status_code=400, detail="Invalid OTP or clinic ID.")
 
 
+def _stream_clinics():
+    """
+    Yield the registered clinics as a JSON array, fetching rows in batches
+    so peak memory stays bounded by the batch size rather than the table
+    """
+    # The request-scoped session is closed before the body is streamed,
+    # so the generator owns its own session
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            select(
+                Clinic.id,
+                Clinic.name,
+                Clinic.phone,
+                Clinic.email,
+                Clinic.address,
+                Clinic.twilio_phone_number,
+                Clinic.elevenlabs_agent_id.label("agent_id"),
+                Clinic.elevenlabs_agent_name.label("agent_name")
+            ).execution_options(yield_per=_CLINIC_STREAM_BATCH)
+        )
+        separator = b"["
+        for row in result.mappings():
+            yield separator + orjson.dumps(dict(row))
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+    finally:
+        db.close()
+
 @router.get("/clinics")
-async def list_registered_clinics(db: Session = Depends(get_db)):
+async def list_registered_clinics():
     """
     Get a list of all registered clinics and their details (id, name, phone, email, address, twilio phone number, agent ID and name).
     """
-    clinics = db.query(Clinic).all()
-    result = []
-    for clinic in clinics:
-        result.append({
-            "id": clinic.id,
-            "name": clinic.name,
-            "phone": clinic.phone,
-            "email": clinic.email,
-            "address": clinic.address,
-            "twilio_phone_number": clinic.twilio_phone_number,
-            "agent_id": clinic.elevenlabs_agent_id,
-            "agent_name": clinic.elevenlabs_agent_name
-        })
-    return result
+    return StreamingResponse(_stream_clinics(), media_type="application/json")
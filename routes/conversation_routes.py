@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Iterator, List, Optional
+import orjson
 from services.conversation_service import conversation_service
+from services.cache_service import cache_service
 from schemas import ConversationDetail, ConversationListResponse
 import logging
 
@@ -11,6 +14,21 @@ router = APIRouter(
     tags=["conversations"]
 )
 
+# Cache lifetimes (seconds): finished conversations never change upstream
+DONE_CONVERSATION_CACHE_TTL = 24 * 60 * 60
+ACTIVE_CONVERSATION_CACHE_TTL = 30
+AGENT_DETAILS_CACHE_TTL = 5 * 60
+
+async def _get_conversation_cached(conversation_id: str) -> Dict[str, Any]:
+    """Fetch conversation details, serving from Redis when available"""
+    cache_key = f"conv:{conversation_id}"
+    conversation = await cache_service.get_json(cache_key)
+    if conversation is None:
+        conversation = await conversation_service.get_conversation_details(conversation_id)
+        expire = DONE_CONVERSATION_CACHE_TTL if conversation.get("status") == "done" else ACTIVE_CONVERSATION_CACHE_TTL
+        await cache_service.set_json(cache_key, conversation, expire)
+    return conversation
+
 @router.get("/agent/{agent_id}", response_model=ConversationListResponse)
 async def list_agent_conversations(
     agent_id: str,
@@ -42,30 +60,43 @@ async def get_conversation_details(conversation_id: str):
     metadata, and analysis.
     """
     try:
-        conversation = await conversation_service.get_conversation_details(conversation_id)
-        return conversation
+        return await _get_conversation_cached(conversation_id)
     except Exception as e:
         logger.error(f"Error fetching conversation {conversation_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def _stream_transcript(conversation_id: str, transcript: List[Dict[str, Any]], format: str) -> Iterator[bytes]:
+    """
+    Yield {"conversation_id": ..., "transcript": ...} piece by piece so long
+    transcripts are never serialized into one buffer
+    """
+    yield b'{"conversation_id":' + orjson.dumps(conversation_id) + b',"transcript":'
+    if format == "text":
+        # One JSON string with turns joined by newlines, emitted a line at a time
+        separator = b'"'
+        for line in conversation_service.iter_transcript_lines(transcript):
+            yield separator + orjson.dumps(line)[1:-1]
+            separator = b"\\n"
+        yield b'""}' if separator == b'"' else b'"}'
+    else:
+        separator = b"["
+        for turn in transcript:
+            yield separator + orjson.dumps(turn)
+            separator = b","
+        yield b"[]}" if separator == b"[" else b"]}"
+
 @router.get("/{conversation_id}/transcript")
 async def get_conversation_transcript(conversation_id: str, format: str = Query("text", enum=["text", "json"])):
     """
     Get the transcript of a conversation in either text or JSON format.
     """
     try:
-        conversation = await conversation_service.get_conversation_details(conversation_id)
-        
-        if format == "text":
-            # Format transcript as readable text
-            transcript_text = conversation_service.format_transcript(conversation.get("transcript", []))
-            return {"conversation_id": conversation_id, "transcript": transcript_text}
-        else:
-            # Return raw transcript data
-            return {
-                "conversation_id": conversation_id,
-                "transcript": conversation.get("transcript", [])
-            }
+        conversation = await _get_conversation_cached(conversation_id)
+        transcript = conversation.get("transcript") or []
+        return StreamingResponse(
+            _stream_transcript(conversation_id, transcript, format),
+            media_type="application/json"
+        )
     except Exception as e:
         logger.error(f"Error fetching transcript for conversation {conversation_id}: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -80,7 +111,11 @@ async def get_agent_conversation_stats(agent_id: str):
     """
     try:
         # Get agent details first
-        agent = await conversation_service.get_agent_details(agent_id)
+        cache_key = f"agent:{agent_id}"
+        agent = await cache_service.get_json(cache_key)
+        if agent is None:
+            agent = await conversation_service.get_agent_details(agent_id)
+            await cache_service.set_json(cache_key, agent, AGENT_DETAILS_CACHE_TTL)
         
         return {
             "agent_id": agent_id,
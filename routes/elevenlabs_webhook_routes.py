@@ -2,31 +2,71 @@
 ElevenLabs webhook routes for conversation events
 """
 from fastapi import APIRouter, Request, HTTPException, Depends, Response
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import logging
-from sqlalchemy.orm import Session
-from database import get_db
-from models import Call, Clinic, CallStatus, CallType
+from cachetools import TTLCache
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
+from models import Call, Clinic, CallStatus, CallType, normalize_phone_key
 from services.conversation_service import conversation_service
-import json
+from services.cache_service import cache_service
+import orjson
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/webhooks/elevenlabs", tags=["elevenlabs-webhooks"])
 
+# agent_id -> (clinic id, twilio phone number). Clinic routing data rarely
+# changes, so up to 5 minutes of staleness is accepted for webhooks.
+_clinic_cache = TTLCache(maxsize=1024, ttl=300)
+
+# ElevenLabs conversation status -> our call status
+_STATUS_MAP: Dict[str, CallStatus] = {
+    "initiated": CallStatus.INITIATED,
+    "in-progress": CallStatus.IN_PROGRESS,
+    "processing": CallStatus.IN_PROGRESS,
+    "done": CallStatus.COMPLETED,
+    "failed": CallStatus.FAILED
+}
+
+# How long a processed (conversation_id, status) delivery is remembered
+IDEMPOTENCY_TTL = 3600
+
+async def _get_clinic_by_agent(db: AsyncSession, agent_id: str) -> Optional[Tuple[int, Optional[str]]]:
+    """
+    Resolve the clinic for an ElevenLabs agent, caching plain values rather
+    than the ORM object so nothing bound to the request session is retained
+    """
+    clinic = _clinic_cache.get(agent_id)
+    if clinic is not None:
+        return clinic
+    
+    result = await db.execute(
+        select(Clinic.id, Clinic.twilio_phone_number)
+        .where(Clinic.elevenlabs_agent_id == agent_id)
+        .limit(1)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    
+    clinic = (row.id, row.twilio_phone_number)
+    _clinic_cache[agent_id] = clinic
+    return clinic
+
 @router.post("/conversation-status")
 async def handle_conversation_status(
     request: Request,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Handle ElevenLabs conversation status webhook
     This webhook is called by ElevenLabs to notify about conversation events
     """
     try:
-        # Get the raw body for logging
-        body = await request.json()
-        logger.info(f"Received ElevenLabs webhook: {json.dumps(body)}")
+        body = orjson.loads(await request.body())
         
         # Extract key fields
         conversation_id = body.get("conversation_id")
@@ -34,89 +74,111 @@ async def handle_conversation_status(
         status = body.get("status")
         metadata = body.get("metadata", {})
         
+        logger.info("ElevenLabs webhook conversation=%s agent=%s status=%s", conversation_id, agent_id, status)
+        # Only pay for re-serializing the full payload when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("payload=%s", orjson.dumps(body).decode())
+        
         if not conversation_id:
             logger.error("No conversation_id in webhook payload")
             return {"status": "error", "message": "No conversation_id provided"}
         
-        # Find the clinic by agent_id
-        if agent_id:
-            clinic = db.query(Clinic).filter(Clinic.agent_id == agent_id).first()
-            if clinic:
-                # Try to find an existing call without conversation_id that matches
-                # the phone numbers (if provided in metadata)
-                caller_phone = metadata.get("caller_id") or metadata.get("from_number")
-                
-                if caller_phone:
-                    # Find the most recent call from this number to this clinic
-                    call = db.query(Call).filter(
-                        Call.clinic_id == clinic.id,
-                        Call.from_number.contains(caller_phone.replace("+", "")),
-                        Call.conversation_id.is_(None)
-                    ).order_by(Call.created_at.desc()).first()
-                    
-                    if call:
-                        # Update the call with conversation_id
-                        call.conversation_id = conversation_id
-                        
-                        # Update status based on ElevenLabs status
-                        status_mapping = {
-                            "initiated": CallStatus.INITIATED,
-                            "in-progress": CallStatus.IN_PROGRESS,
-                            "processing": CallStatus.IN_PROGRESS,
-                            "done": CallStatus.COMPLETED,
-                            "failed": CallStatus.FAILED
-                        }
-                        if status in status_mapping:
-                            call.status = status_mapping[status]
-                        
-                        db.commit()
-                        logger.info(f"Updated call {call.id} with conversation_id {conversation_id}")
-                    else:
-                        # Create a new call record for inbound calls
-                        new_call = Call(
-                            clinic_id=clinic.id,
-                            conversation_id=conversation_id,
-                            from_number=caller_phone or "Unknown",
-                            to_number=clinic.twilio_phone_number or "Unknown",
-                            call_type=CallType.INBOUND,
-                            status=CallStatus.IN_PROGRESS
-                        )
-                        db.add(new_call)
-                        db.commit()
-                        logger.info(f"Created new call record for conversation {conversation_id}")
+        # ElevenLabs retries deliveries; skip ones already fully processed
+        idempotency_key = f"elw:{conversation_id}:{status}"
+        if await cache_service.exists(idempotency_key):
+            return {"status": "duplicate", "conversation_id": conversation_id}
         
-        # If the conversation is done, sync the full details
+        # Match the webhook to a pending call from the caller (if provided in metadata)
+        caller_phone = metadata.get("caller_id") or metadata.get("from_number")
+        
+        clinic = await _get_clinic_by_agent(db, agent_id) if agent_id and caller_phone else None
+        
+        if clinic:
+            clinic_id, twilio_phone_number = clinic
+            phone_key = normalize_phone_key(caller_phone)
+            
+            # Claim the most recent pending call from this number to this clinic
+            # and attach the conversation in a single UPDATE ... RETURNING
+            pending_call = (
+                select(Call.id)
+                .where(
+                    Call.clinic_id == clinic_id,
+                    Call.from_number_e164 == phone_key,
+                    Call.conversation_id.is_(None)
+                )
+                .order_by(Call.created_at.desc())
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            values = {"conversation_id": conversation_id}
+            
+            # Update status based on ElevenLabs status
+            mapped = _STATUS_MAP.get(status)
+            if mapped is not None:
+                values["status"] = mapped
+            
+            result = await db.execute(
+                update(Call).where(Call.id == pending_call).values(**values).returning(Call.id)
+            )
+            call_id = result.scalar_one_or_none()
+            
+            if call_id is None:
+                # Create a new call record for inbound calls; a retried webhook
+                # for the same conversation hits the unique key and is a no-op
+                await db.execute(
+                    pg_insert(Call)
+                    .values(
+                        clinic_id=clinic_id,
+                        conversation_id=conversation_id,
+                        from_number=caller_phone,
+                        from_number_e164=phone_key,
+                        to_number=twilio_phone_number or "Unknown",
+                        call_type=CallType.INBOUND,
+                        status=CallStatus.IN_PROGRESS
+                    )
+                    .on_conflict_do_nothing(index_elements=[Call.conversation_id])
+                )
+            
+            # One commit for whichever write path ran
+            await db.commit()
+            if call_id is None:
+                logger.info("Created new call record for conversation %s", conversation_id)
+            else:
+                logger.info("Updated call %s with conversation_id %s", call_id, conversation_id)
+        
+        # If the conversation is done, queue a sync of the full details
         if status == "done":
-            try:
-                await conversation_service.sync_conversation_details(conversation_id)
-            except Exception as e:
-                logger.error(f"Error syncing conversation details: {str(e)}")
+            conversation_service.enqueue_sync(conversation_id)
+        
+        # Marked only after the writes are committed and the sync is queued, so
+        # a delivery that failed part-way is still processed on retry
+        await cache_service.set_once(idempotency_key, expire=IDEMPOTENCY_TTL)
         
         return {"status": "success", "conversation_id": conversation_id}
         
     except Exception as e:
-        logger.error(f"Error processing ElevenLabs webhook: {str(e)}")
+        logger.error("Error processing ElevenLabs webhook: %s", e)
         return {"status": "error", "message": str(e)}
 
 @router.post("/call-ended")
-async def handle_call_ended(
-    request: Request,
-    db: Session = Depends(get_db)
-):
+async def handle_call_ended(request: Request):
     """
     Handle ElevenLabs call ended webhook
     """
     try:
-        body = await request.json()
-        logger.info(f"Received call ended webhook: {json.dumps(body)}")
+        body = orjson.loads(await request.body())
         
         conversation_id = body.get("conversation_id")
+        logger.info("ElevenLabs call ended conversation=%s", conversation_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("payload=%s", orjson.dumps(body).decode())
         if conversation_id:
-            # Sync the final conversation details
-            await conversation_service.sync_conversation_details(conversation_id)
+            # Queue a sync of the final conversation details
+            conversation_service.enqueue_sync(conversation_id)
         
         return {"status": "success"}
         
     except Exception as e:
-        logger.error(f"Error processing call ended webhook: {str(e)}")
+        logger.error("Error processing call ended webhook: %s", e)
         return {"status": "error", "message": str(e)}
\ No newline at end of file
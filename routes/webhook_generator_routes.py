@@ -1,4 +1,6 @@
 from fastapi import APIRouter, HTTPException
+from functools import lru_cache
+import asyncio
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional, Dict, Any
 from services.webhook_generator_service import WebhookGeneratorService
@@ -28,19 +30,34 @@ class WebhookGenRequest(BaseModel):
 class WebhookGenResponse(BaseModel):
     configs: List[dict]
 
+@lru_cache(maxsize=1)
+def get_webhook_generator_service() -> WebhookGeneratorService:
+    """Shared service instance; WebhookGeneratorService holds no per-request state"""
+    return WebhookGeneratorService()
+
 @router.post("/generate", response_model=WebhookGenResponse)
-def generate_webhook(request: WebhookGenRequest, current_user: dict = Depends(get_current_user)):
+async def generate_webhook(
+    request: WebhookGenRequest,
+    current_user: dict = Depends(get_current_user),
+    service: WebhookGeneratorService = Depends(get_webhook_generator_service)
+):
     if current_user.get("user_type") != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
-    service = WebhookGeneratorService()
     try:
-        epic_creds_dict = request.epic_creds.dict() if request.epic_creds else None
-        athena_creds_dict = request.athena_creds.dict() if request.athena_creds else None
+        epic_creds_dict = request.epic_creds.model_dump() if request.epic_creds else None
+        athena_creds_dict = request.athena_creds.model_dump() if request.athena_creds else None
         if request.ehr in ("epic", "both") and not epic_creds_dict:
             raise HTTPException(status_code=400, detail="Epic credentials are required for Epic webhook generation.")
         if request.ehr in ("athena", "both") and not athena_creds_dict:
             raise HTTPException(status_code=400, detail="Athena credentials are required for Athena webhook generation.")
-        configs = service.generate_webhook_config(request.clinic_id, request.ehr, epic_creds=epic_creds_dict, athena_creds=athena_creds_dict)
+        # Config generation is CPU-only templating; run it off the event loop
+        configs = await asyncio.to_thread(
+            service.generate_webhook_config,
+            request.clinic_id,
+            request.ehr,
+            epic_creds=epic_creds_dict,
+            athena_creds=athena_creds_dict
+        )
         return {"configs": configs}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
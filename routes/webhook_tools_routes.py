@@ -1,4 +1,9 @@
 from fastapi import APIRouter, Request, HTTPException
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, ValidationError, create_model
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import asyncio
+import inspect
 import logging
 from integration import athena_health_client
 from integration import webhook_tools  # Import the static endpoints router
@@ -9,6 +14,64 @@ logger = logging.getLogger(__name__)
 # Include all static endpoints from integration/webhook_tools.py
 router.include_router(webhook_tools.router)
 
+# Athena functions the voice agent may invoke. Hand-curated so a path segment can
+# never reach helpers like get_access_token or test_connection.
+_ATHENA_ALLOWED: Dict[str, Callable] = {
+    "check_availability": athena_health_client.check_availability,
+    "get_patient_details": athena_health_client.get_patient_details,
+    "get_patient_insurance": athena_health_client.get_patient_insurance,
+    "get_patient_appointment_reasons": athena_health_client.get_patient_appointment_reasons,
+    "get_appointment_types": athena_health_client.get_appointment_types,
+    "book_appointment": athena_health_client.book_appointment,
+    "create_appointment": athena_health_client.create_appointment,
+    "update_appointment": athena_health_client.update_appointment,
+    "search_patients": athena_health_client.search_patients,
+    "update_patient": athena_health_client.update_patient,
+    "cancel_appointment": athena_health_client.cancel_appointment,
+    "get_booked_appointments": athena_health_client.get_booked_appointments,
+    "get_patient_appointments": athena_health_client.get_patient_appointments,
+    "get_all_providers": athena_health_client.get_all_providers,
+    "get_provider_details": athena_health_client.get_provider_details,
+    "create_appointment_slot": athena_health_client.create_appointment_slot,
+    "verify_patient_insurance": athena_health_client.verify_patient_insurance,
+    "get_insurance_benefits": athena_health_client.get_insurance_benefits,
+    "create_appointment_reminder": athena_health_client.create_appointment_reminder,
+    "get_appointment_reminders": athena_health_client.get_appointment_reminders,
+    "update_appointment_reminder": athena_health_client.update_appointment_reminder,
+    "delete_appointment_reminder": athena_health_client.delete_appointment_reminder,
+    "create_patient": athena_health_client.create_patient,
+}
+
+# function name -> (function, is_async), built once so dispatch is a single dict hit
+_ATHENA_DISPATCH: Dict[str, Tuple[Callable, bool]] = {
+    name: (fn, asyncio.iscoroutinefunction(fn)) for name, fn in _ATHENA_ALLOWED.items()
+}
+
+def _build_args_model(name: str, fn: Callable) -> Type[BaseModel]:
+    """Build a Pydantic model mirroring the keyword parameters of an Athena function"""
+    fields: Dict[str, Any] = {}
+    for param in inspect.signature(fn).parameters.values():
+        if param.kind in (param.VAR_POSITIONAL, param.VAR_KEYWORD):
+            continue
+        annotation = Any if param.annotation is inspect.Parameter.empty else param.annotation
+        if param.default is inspect.Parameter.empty:
+            fields[param.name] = (annotation, ...)
+        elif param.default is None:
+            fields[param.name] = (Optional[annotation], None)
+        else:
+            fields[param.name] = (annotation, param.default)
+    # Tool calls often send numeric IDs for str parameters; accept them as the baseline did
+    return create_model(
+        f"{name}Args",
+        __config__=ConfigDict(extra="forbid", coerce_numbers_to_str=True),
+        **fields
+    )
+
+# function name -> argument model, so request bodies are validated before dispatch
+_ATHENA_MODELS: Dict[str, Type[BaseModel]] = {
+    name: _build_args_model(name, fn) for name, (fn, _) in _ATHENA_DISPATCH.items()
+}
+
 @router.api_route("/athena/{clinic_id}/{function_name}", methods=["GET", "POST"])
 async def athena_dynamic_webhook(clinic_id: str, function_name: str, request: Request):
     """
@@ -17,19 +80,20 @@ async def athena_dynamic_webhook(clinic_id: str, function_name: str, request: Re
     if request.method == "GET":
         return {"message": "GET received. This endpoint is intended for POST with a JSON body. Please use POST for production webhooks.", "clinic_id": clinic_id, "function_name": function_name}
     try:
-        body = await request.json()
-        func = getattr(athena_health_client, function_name, None)
-        if not func:
+        entry = _ATHENA_DISPATCH.get(function_name)
+        if entry is None:
             raise HTTPException(status_code=404, detail=f"Athena function '{function_name}' not found.")
-        # Support both sync and async Athena functions
-        if callable(func):
-            if hasattr(func, "__code__") and func.__code__.co_flags & 0x80:  # async function
-                result = await func(**body)
-            else:
-                result = func(**body)
-            return result
-        else:
-            raise HTTPException(status_code=500, detail=f"Attribute '{function_name}' is not callable.")
+        func, is_async = entry
+        try:
+            args = _ATHENA_MODELS[function_name].model_validate_json(await request.body()).model_dump()
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        # Sync Athena functions do blocking HTTP, so keep them off the event loop
+        if is_async:
+            return await func(**args)
+        return await run_in_threadpool(func, **args)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Error in Athena dynamic webhook")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,9 +1,10 @@
 from dataclasses import field
-from pydantic import BaseModel, EmailStr, Field, validator
-from typing import Optional, List, Dict, Any
-from datetime import datetime, date, time
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, field_validator
+from typing import Annotated, Optional, List, Dict, Any, Literal, Tuple, Union
+from datetime import datetime, date, time, timezone
 from decimal import Decimal
 from enum import Enum
+import re
 
 # Enums matching the database models
 class AppointmentStatus(str, Enum):
@@ -56,32 +57,59 @@ class ConversationIntent(str, Enum):
     OTHER = "OTHER"
     ERROR = "ERROR"
 
+_UTC = timezone.utc
+
+def _now() -> datetime:
+    """Timezone-aware UTC now, used for response timestamps"""
+    return datetime.now(_UTC)
+
+# Phone formatting pattern, compiled once for the clinic phone validator
+_NON_DIGIT = re.compile(r'\D')
+
+def _validate_phone(cls, v):
+    """Strip formatting and require at least 10 digits"""
+    if v is None:
+        return v
+    cleaned = _NON_DIGIT.sub('', v)
+    if len(cleaned) < 10:
+        raise ValueError('Phone number must have at least 10 digits')
+    return v
+
+# Contact emails only need a shape check; EmailStr's full RFC/IDNA validation is
+# kept for account registration
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+def _check_email(v: str) -> str:
+    if not _EMAIL_RE.match(v):
+        raise ValueError('Invalid email address')
+    return v
+
+Email = Annotated[str, AfterValidator(_check_email)]
+
+# Shared field types for address and phone columns repeated across schemas
+City = Annotated[Optional[str], Field(max_length=100)]
+State = Annotated[Optional[str], Field(max_length=50)]
+Zip = Annotated[Optional[str], Field(max_length=10)]
+Phone = Annotated[str, Field(min_length=10, max_length=20)]
+
 # Base schema classes
 class BaseSchema(BaseModel):
-    class Config:
-        from_attributes = True
-        use_enum_values = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Clinic Schemas
 class ClinicBase(BaseSchema):
     name: str = Field(..., min_length=1, max_length=255)
-    phone: str = Field(..., min_length=10, max_length=20)
-    email: Optional[EmailStr] = None
+    phone: Phone
+    email: Optional[Email] = None
     address: Optional[str] = None
-    city: Optional[str] = Field(None, max_length=100)
-    state: Optional[str] = Field(None, max_length=50)
-    zip_code: Optional[str] = Field(None, max_length=10)
-    business_hours: Optional[Dict[str, Any]] = None
+    city: City = None
+    state: State = None
+    zip_code: Zip = None
+    business_hours: Any = None
     timezone: str = Field(default="UTC", max_length=50)
     website: Optional[str] = Field(None, max_length=255)
     
-    @validator('phone')
-    def validate_phone(cls, v):
-        # Remove common phone formatting
-        cleaned = ''.join(filter(str.isdigit, v))
-        if len(cleaned) < 10:
-            raise ValueError('Phone number must have at least 10 digits')
-        return v
+    _phone_validator = field_validator('phone', mode='after')(_validate_phone)
 
 class ClinicCreate(ClinicBase):
     ai_voice_id: Optional[str] = Field(None, max_length=100)
@@ -91,13 +119,13 @@ class ClinicCreate(ClinicBase):
 
 class ClinicUpdate(BaseSchema):
     name: Optional[str] = Field(None, min_length=1, max_length=255)
-    phone: Optional[str] = Field(None, min_length=10, max_length=20)
-    email: Optional[EmailStr] = None
+    phone: Optional[Phone] = None
+    email: Optional[Email] = None
     address: Optional[str] = None
-    city: Optional[str] = Field(None, max_length=100)
-    state: Optional[str] = Field(None, max_length=50)
-    zip_code: Optional[str] = Field(None, max_length=10)
-    business_hours: Optional[Dict[str, Any]] = None
+    city: City = None
+    state: State = None
+    zip_code: Zip = None
+    business_hours: Any = None
     timezone: Optional[str] = Field(None, max_length=50)
     website: Optional[str] = Field(None, max_length=255)
     ai_voice_id: Optional[str] = Field(None, max_length=100)
@@ -116,13 +144,13 @@ class ClinicResponse(ClinicBase):
 class PatientBase(BaseSchema):
     first_name: str = Field(..., min_length=1, max_length=100)
     last_name: str = Field(..., min_length=1, max_length=100)
-    phone: str = Field(..., min_length=10, max_length=20)
-    email: Optional[EmailStr] = None
+    phone: Phone
+    email: Optional[Email] = None
     date_of_birth: Optional[datetime] = None
     address: Optional[str] = None
-    city: Optional[str] = Field(None, max_length=100)
-    state: Optional[str] = Field(None, max_length=50)
-    zip_code: Optional[str] = Field(None, max_length=10)
+    city: City = None
+    state: State = None
+    zip_code: Zip = None
     preferred_contact_method: str = Field(default="phone", max_length=20)
     preferred_language: str = Field(default="en", max_length=10)
 
@@ -136,13 +164,13 @@ class PatientCreate(PatientBase):
 class PatientUpdate(BaseSchema):
     first_name: Optional[str] = Field(None, min_length=1, max_length=100)
     last_name: Optional[str] = Field(None, min_length=1, max_length=100)
-    phone: Optional[str] = Field(None, min_length=10, max_length=20)
-    email: Optional[EmailStr] = None
+    phone: Optional[Phone] = None
+    email: Optional[Email] = None
     date_of_birth: Optional[datetime] = None
     address: Optional[str] = None
-    city: Optional[str] = Field(None, max_length=100)
-    state: Optional[str] = Field(None, max_length=50)
-    zip_code: Optional[str] = Field(None, max_length=10)
+    city: City = None
+    state: State = None
+    zip_code: Zip = None
     insurance_provider: Optional[str] = Field(None, max_length=255)
     insurance_id: Optional[str] = Field(None, max_length=100)
     insurance_group: Optional[str] = Field(None, max_length=100)
@@ -168,29 +196,29 @@ class PatientResponse(PatientBase):
 class StaffBase(BaseSchema):
     first_name: str = Field(..., min_length=1, max_length=100)
     last_name: str = Field(..., min_length=1, max_length=100)
-    email: EmailStr
-    phone: Optional[str] = Field(None, max_length=20)
+    email: Email
+    phone: Optional[Phone] = None
     role: StaffRole
-    schedule: Optional[Dict[str, Any]] = None
+    schedule: Any = None
 
 class StaffCreate(StaffBase):
     clinic_id: int
-    permissions: Optional[Dict[str, Any]] = None
+    permissions: Any = None
 
 class StaffUpdate(BaseSchema):
     first_name: Optional[str] = Field(None, min_length=1, max_length=100)
     last_name: Optional[str] = Field(None, min_length=1, max_length=100)
-    email: Optional[EmailStr] = None
-    phone: Optional[str] = Field(None, max_length=20)
+    email: Optional[Email] = None
+    phone: Optional[Phone] = None
     role: Optional[StaffRole] = None
-    permissions: Optional[Dict[str, Any]] = None
-    schedule: Optional[Dict[str, Any]] = None
+    permissions: Any = None
+    schedule: Any = None
     is_active: Optional[bool] = None
 
 class StaffResponse(StaffBase):
     id: int
     clinic_id: int
-    permissions: Optional[Dict[str, Any]] = None
+    permissions: Any = None
     is_active: bool
     created_at: datetime
     updated_at: Optional[datetime] = None
@@ -256,12 +284,12 @@ class CallUpdate(BaseSchema):
     transcript: Optional[str] = None
     ai_summary: Optional[str] = None
     intent_detected: Optional[str] = Field(None, max_length=100)
-    confidence_score: Optional[Decimal] = Field(None, ge=0, le=1)
+    confidence_score: Optional[float] = Field(None, ge=0, le=1)
     outcome: Optional[str] = Field(None, max_length=100)
     handoff_to_human: Optional[bool] = None
     handoff_reason: Optional[str] = Field(None, max_length=255)
     patient_satisfaction: Optional[int] = Field(None, ge=1, le=5)
-    call_quality_score: Optional[Decimal] = Field(None, ge=0, le=1)
+    call_quality_score: Optional[float] = Field(None, ge=0, le=1)
     recording_url: Optional[str] = Field(None, max_length=500)
     recording_duration: Optional[int] = Field(None, ge=0)
     started_at: Optional[datetime] = None
@@ -278,12 +306,12 @@ class CallResponse(CallBase):
     transcript: Optional[str] = None
     ai_summary: Optional[str] = None
     intent_detected: Optional[str] = None
-    confidence_score: Optional[Decimal] = None
+    confidence_score: Optional[float] = None
     outcome: Optional[str] = None
     handoff_to_human: bool
     handoff_reason: Optional[str] = None
     patient_satisfaction: Optional[int] = None
-    call_quality_score: Optional[Decimal] = None
+    call_quality_score: Optional[float] = None
     recording_url: Optional[str] = None
     recording_duration: Optional[int] = None
     started_at: Optional[datetime] = None
@@ -326,11 +354,13 @@ class ConversationContext(BaseSchema):
     patient_id: Optional[int] = None
     patient_phone: Optional[str] = None
     conversation_start: datetime
-    messages: List[Dict[str, Any]] = []
+    messages: Any = Field(default_factory=list)
     summary: str = ""
-    metadata: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Any = Field(default_factory=dict)
 
 class IntentResult(BaseSchema):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     intent: str
     confidence: float
     entities: Dict[str, Any] = {}
@@ -342,15 +372,36 @@ class AIResponse(BaseSchema):
     requires_human: bool = False
     priority: str = "normal"
     confidence: Optional[float] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = Field(default_factory=_now)
 
-class ConversationRequest(BaseSchema):
+# AI request schemas share one base and are told apart by the "kind" tag, so
+# AIRequest validates through a single tagged-union validator
+class AIRequestBase(BaseSchema):
     message: str
     clinic_id: int
+
+class ConversationRequest(AIRequestBase):
+    kind: Literal['conversation'] = 'conversation'
     call_id: Optional[str] = None
     patient_phone: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
 
+class AIConversationRequest(AIRequestBase):
+    kind: Literal['ai_conversation'] = 'ai_conversation'
+    patient_id: Optional[int] = None
+    call_id: Optional[int] = None
+    context: Optional[Dict[str, Any]] = None
+
+class IntentClassificationRequest(AIRequestBase):
+    kind: Literal['intent'] = 'intent'
+    call_id: Optional[str] = None
+    patient_phone: Optional[str] = None
+
+AIRequest = Annotated[
+    Union[ConversationRequest, AIConversationRequest, IntentClassificationRequest],
+    Field(discriminator='kind')
+]
+
 class ConversationResponse(BaseSchema):
     message: str
     intent: str
@@ -360,12 +411,6 @@ class ConversationResponse(BaseSchema):
     confidence: Optional[float] = None
     timestamp: Optional[datetime] = None
 
-class IntentClassificationRequest(BaseSchema):
-    message: str
-    clinic_id: int
-    call_id: Optional[str] = None
-    patient_phone: Optional[str] = None
-
 class IntentClassificationResponse(BaseSchema):
     intent: str
     confidence: float
@@ -411,13 +456,13 @@ class InsurancePlanResponse(InsurancePlanBase):
 
 # Call Analytics Schemas
 class CallAnalyticsBase(BaseSchema):
-    sentiment_score: Optional[Decimal] = Field(None, ge=-1, le=1)
+    sentiment_score: Optional[float] = Field(None, ge=-1, le=1)
     emotion_detected: Optional[str] = Field(None, max_length=50)
-    key_phrases: Optional[List[str]] = None
-    topics_discussed: Optional[List[str]] = None
-    response_time_avg: Optional[Decimal] = Field(None, ge=0)
-    understanding_score: Optional[Decimal] = Field(None, ge=0, le=1)
-    resolution_score: Optional[Decimal] = Field(None, ge=0, le=1)
+    key_phrases: Optional[Tuple[str, ...]] = None
+    topics_discussed: Optional[Tuple[str, ...]] = None
+    response_time_avg: Optional[float] = Field(None, ge=0)
+    understanding_score: Optional[float] = Field(None, ge=0, le=1)
+    resolution_score: Optional[float] = Field(None, ge=0, le=1)
     conversion_achieved: bool = False
     conversion_type: Optional[str] = Field(None, max_length=100)
 
@@ -436,7 +481,7 @@ class SystemLogBase(BaseSchema):
     level: str = Field(..., max_length=20)
     message: str = Field(..., min_length=1)
     component: Optional[str] = Field(None, max_length=100)
-    context_data: Optional[Dict[str, Any]] = None
+    context_data: Any = None
     user_id: Optional[str] = Field(None, max_length=100)
     session_id: Optional[str] = Field(None, max_length=100)
 
@@ -450,6 +495,8 @@ class SystemLogResponse(SystemLogBase):
 
 # Calendar Service Schemas
 class TimeSlot(BaseSchema):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     start_time: datetime
     end_time: datetime
     is_available: bool = True
@@ -459,7 +506,11 @@ class AppointmentReschedule(BaseSchema):
     reason: Optional[str] = None
 
 # Aggregated Response Schemas for Complex Queries
+# These nest several models, so their core schemas are built on first use
+# (defer_build) rather than at import
 class PatientWithAppointments(PatientResponse):
+    model_config = ConfigDict(defer_build=True)
+    
     appointments: List[AppointmentResponse] = []
 
 class ClinicWithStats(ClinicResponse):
@@ -469,11 +520,15 @@ class ClinicWithStats(ClinicResponse):
     active_staff: int = 0
 
 class AppointmentWithDetails(AppointmentResponse):
+    model_config = ConfigDict(defer_build=True)
+    
     patient: Optional[PatientResponse] = None
     staff_member: Optional[StaffResponse] = None
     clinic: Optional[ClinicResponse] = None
 
 class CallWithDetails(CallResponse):
+    model_config = ConfigDict(defer_build=True)
+    
     patient: Optional[PatientResponse] = None
     appointment: Optional[AppointmentResponse] = None
     clinic: Optional[ClinicResponse] = None
@@ -504,18 +559,11 @@ class VoiceProcessingResponse(BaseSchema):
     error_message: Optional[str] = None
     processing_time: Optional[float] = None
 
-class AIConversationRequest(BaseSchema):
-    message: str
-    clinic_id: int
-    patient_id: Optional[int] = None
-    call_id: Optional[int] = None
-    context: Optional[Dict[str, Any]] = None
-
 class AIConversationResponse(BaseSchema):
     response: str
     intent: Optional[str] = None
     confidence: Optional[float] = None
-    actions: Optional[List[Dict[str, Any]]] = None
+    actions: Any = None
     requires_handoff: bool = False
     handoff_reason: Optional[str] = None
 
@@ -528,6 +576,8 @@ class AvailabilityRequest(BaseSchema):
     duration_minutes: int = 30
 
 class AvailabilitySlot(BaseSchema):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     start_time: datetime
     end_time: datetime
     staff_id: Optional[int] = None
@@ -566,6 +616,8 @@ class AppointmentMetrics(BaseSchema):
     no_show_rate: Optional[float] = None
 
 class ClinicDashboard(BaseSchema):
+    model_config = ConfigDict(defer_build=True)
+    
     clinic: ClinicResponse
     call_metrics: CallMetrics
     appointment_metrics: AppointmentMetrics
@@ -586,6 +638,8 @@ class CallAnalytics(BaseSchema):
 
 # Pagination Schemas
 class PaginationParams(BaseSchema):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     page: int = Field(default=1, ge=1)
     size: int = Field(default=50, ge=1, le=100)
 
@@ -598,6 +652,8 @@ class PaginatedResponse(BaseSchema):
 
 # Error Response Schemas
 class ErrorDetail(BaseSchema):
+    model_config = ConfigDict(frozen=True, extra='forbid')
+    
     field: Optional[str] = None
     message: str
     code: Optional[str] = None
@@ -605,7 +661,7 @@ class ErrorDetail(BaseSchema):
 class ErrorResponse(BaseSchema):
     error: str
     details: Optional[List[ErrorDetail]] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = Field(default_factory=_now)
 
 # Health Check Schema
 class HealthCheckResponse(BaseSchema):
@@ -618,11 +674,17 @@ class HealthCheckResponse(BaseSchema):
 
 # Conversation Schemas for ElevenLabs Integration
 class ConversationTranscriptEntry(BaseSchema):
-    role: str  # "user" or "agent"
+    # Mirrors ElevenLabs payloads, which carry extra keys, so only frozen
+    model_config = ConfigDict(frozen=True)
+    
+    role: Literal['user', 'agent']
     time_in_call_secs: float
     message: str
 
 class ConversationMetadata(BaseSchema):
+    # Mirrors ElevenLabs payloads, which carry extra keys, so only frozen
+    model_config = ConfigDict(frozen=True)
+    
     start_time_unix_secs: int
     call_duration_secs: Optional[int] = None
 
@@ -644,7 +706,7 @@ class ConversationDetail(BaseSchema):
     has_response_audio: bool
     user_id: Optional[str] = None
     analysis: Optional[ConversationAnalysis] = None
-    conversation_initiation_client_data: Optional[Dict[str, Any]] = None
+    conversation_initiation_client_data: Any = None
 
 class ConversationListResponse(BaseSchema):
     conversations: List[Any]
@@ -652,4 +714,15 @@ class ConversationListResponse(BaseSchema):
     page: int
     size: int
     agent_id: str
-    message: Optional[str] = None
\ No newline at end of file
+    message: Optional[str] = None
+
+def warm_schemas() -> None:
+    """
+    Build validators and serializers for every schema still deferred, so the
+    first request to use an aggregate response doesn't pay for it. Called from
+    the app lifespan rather than at import, keeping imports cheap for scripts
+    and tests.
+    """
+    for cls in list(globals().values()):
+        if isinstance(cls, type) and issubclass(cls, BaseSchema) and not cls.__pydantic_complete__:
+            cls.model_rebuild(force=True)
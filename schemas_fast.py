@@ -0,0 +1,28 @@
+"""
+msgspec structs for high-volume internal types.
+These skip Pydantic validation on hot paths; convert to the matching schemas.py
+model only at an API boundary that needs one.
+"""
+from datetime import datetime
+from typing import List
+
+import msgspec
+
+
+class TimeSlotFast(msgspec.Struct, frozen=True):
+    start_time: datetime
+    end_time: datetime
+    is_available: bool = True
+
+
+class CalendlyAvailableTime(msgspec.Struct):
+    start_time: datetime
+    end_time: datetime
+
+
+class CalendlyAvailableTimes(msgspec.Struct):
+    collection: List[CalendlyAvailableTime] = []
+
+
+# Decoder singletons, built once so each response is decoded straight into structs
+calendly_available_times_decoder = msgspec.json.Decoder(CalendlyAvailableTimes)
@@ -3,19 +3,159 @@ Agent Setup Service for Clinic AI Assistant
 Handles ElevenLabs agent configuration and outbound call functionality
 """
 import os
+import asyncio
+import copy
+import random
+import time
 import logging
+import threading
+import weakref
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from types import MappingProxyType
+import httpx
 import requests
-from typing import Optional, Dict, Any, List
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+from typing import Optional, Dict, Any, List, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import tuple_
 from dotenv import load_dotenv
 from elevenlabs import ElevenLabs
 from models import Clinic, Call, CallType, CallStatus, KnowledgeBase
 
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Knowledge-base documents can be large; allow longer than the client default
+UPLOAD_TIMEOUT = 60.0
+
+# How long a fetched agent configuration is reused across sibling KB operations
+AGENT_CONFIG_CACHE_TTL = 30
+
+# Clinic numbers rarely change, so ElevenLabs phone IDs are reused for 10 minutes
+PHONE_ID_CACHE_TTL = 600
+
+# The background refresh reloads every phone ID well inside the cache TTL
+PHONE_MAP_REFRESH_INTERVAL = 300
+
+# Clinic rows read by agent setup are reused for a minute
+CLINIC_INFO_CACHE_TTL = 60
+
+# Rate-limited (429) ElevenLabs requests are retried this many times, waiting
+# Retry-After when given, else exponential backoff capped at RATE_LIMIT_BACKOFF_CAP
+# seconds plus up to RATE_LIMIT_JITTER seconds of jitter. A Retry-After longer than
+# the cap is not waited out: the 429 goes straight back to the caller
+RATE_LIMIT_RETRIES = 3
+RATE_LIMIT_BACKOFF_BASE = 0.5
+RATE_LIMIT_BACKOFF_CAP = 8.0
+RATE_LIMIT_JITTER = 0.3
+
+# Upload MIME types for knowledge-base documents, keyed by lowercase extension
+_MIME_TYPES = MappingProxyType({
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.txt': 'text/plain',
+    '.html': 'text/html',
+    '.epub': 'application/epub+zip'
+})
+
+@dataclass(frozen=True)
+class ClinicAgentInfo:
+    """Plain snapshot of the clinic columns used here, safe to share across sessions"""
+    id: int
+    name: str
+    elevenlabs_agent_id: Optional[str]
+    elevenlabs_agent_name: Optional[str]
+    twilio_phone_number: Optional[str]
+    twilio_phone_sid: Optional[str]
+    ai_voice_id: Optional[str]
+    ai_personality: Optional[str]
+    greeting_message: Optional[str]
+    knowledge_base_id: Optional[str]
+    elevenlabs_phone_id: Optional[str]
+
+class _CappedRetry(Retry):
+    """urllib3 Retry that never sleeps longer than RATE_LIMIT_BACKOFF_CAP on a Retry-After header"""
+    
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, RATE_LIMIT_BACKOFF_CAP)
+
+class _RateLimitRetryTransport(httpx.AsyncBaseTransport):
+    """Async transport that retries 429 responses with Retry-After or jittered backoff"""
+    
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+    
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            response = await self._transport.handle_async_request(request)
+            if response.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+                return response
+            
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                # asyncio.sleep is outside the httpx timeout, so never park a request for longer than the cap
+                if float(retry_after) > RATE_LIMIT_BACKOFF_CAP:
+                    return response
+                delay = float(retry_after)
+            else:
+                delay = min(RATE_LIMIT_BACKOFF_CAP, RATE_LIMIT_BACKOFF_BASE * 2 ** attempt)
+            await response.aclose()
+            logger.warning("ElevenLabs rate limited %s %s; retrying in %.2fs", request.method, request.url.path, delay)
+            await asyncio.sleep(delay + random.uniform(0, RATE_LIMIT_JITTER))
+    
+    async def aclose(self):
+        await self._transport.aclose()
+
+# Call columns serialized by get_call_status, and the keys they are returned under
+_CALL_COLUMNS = (
+    Call.id,
+    Call.status,
+    Call.call_type,
+    Call.from_number,
+    Call.to_number,
+    Call.duration_seconds,
+    Call.started_at,
+    Call.ended_at,
+    Call.twilio_call_sid,
+    Call.outcome,
+    Call.handoff_to_human,
+    Call.patient_satisfaction
+)
+_CALL_KEYS = (
+    "call_id",
+    "status",
+    "call_type",
+    "from_number",
+    "to_number",
+    "duration_seconds",
+    "started_at",
+    "ended_at",
+    "twilio_call_sid",
+    "outcome",
+    "handoff_to_human",
+    "patient_satisfaction"
+)
+
+# list_clinic_calls also returns created_at, which pagination cursors are built from
+_CALL_LIST_COLUMNS = _CALL_COLUMNS + (Call.created_at,)
+_CALL_LIST_KEYS = _CALL_KEYS + ("created_at",)
+
+# Enum member -> stored value, so serialization is a dict lookup per row
+_CALL_STATUS_VALUES = MappingProxyType({member: member.value for member in CallStatus})
+_CALL_TYPE_VALUES = MappingProxyType({member: member.value for member in CallType})
+
+def _call_dict(row, keys: Tuple[str, ...]) -> Dict[str, Any]:
+    """Serialize a selected Call row (columns in _CALL_COLUMNS order) to a dictionary"""
+    call = dict(zip(keys, row))
+    call["status"] = _CALL_STATUS_VALUES[call["status"]]
+    call["call_type"] = _CALL_TYPE_VALUES[call["call_type"]]
+    return call
+
+# Logging is configured by the application (main.py)
 logger = logging.getLogger(__name__)
 
 class AgentSetupService:
@@ -36,13 +176,171 @@ class AgentSetupService:
             "Content-Type": "application/json"
         }
         
-        # Initialize ElevenLabs client
+        # One pooled session for every ElevenLabs REST call, so chained requests
+        # (create agent -> upload KB -> assign KB) reuse the TLS connection
+        self.http = requests.Session()
+        self.http.headers.update(self.headers)
+        # Transient server and gateway errors are retried with backoff. POST is
+        # left out: agent creation is not idempotent and a retried 504 could
+        # duplicate it. 429s honour Retry-After and back off with jitter
+        self.http.mount("https://", HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=_CappedRetry(
+                total=3,
+                backoff_factor=0.5,
+                backoff_jitter=RATE_LIMIT_JITTER,
+                backoff_max=RATE_LIMIT_BACKOFF_CAP,
+                respect_retry_after_header=True,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=frozenset(["GET", "HEAD", "PATCH"]),
+                raise_on_status=False
+            )
+        ))
+        
+        # Headers for the async client; no Content-Type, since httpx would let a
+        # client default override the multipart header on file uploads
+        self._file_upload_headers = {"Accept": "application/json", "xi-api-key": self.elevenlabs_api_key}
+        
+        # clinic_id -> ClinicAgentInfo; read from request threads, hence the lock
+        self._clinic_cache = TTLCache(maxsize=1024, ttl=CLINIC_INFO_CACHE_TTL)
+        self._clinic_cache_lock = threading.Lock()
+        
+        # agent_id -> (fetched at, agent configuration)
+        self._agent_cfg_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        
+        # agent_id -> (ETag, agent configuration), for conditional re-fetches
+        self._agent_etags: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        
+        # phone number -> (fetched at, ElevenLabs phone number ID)
+        self._phone_id_cache: Dict[str, Tuple[float, str]] = {}
+        self._phone_lookup_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+        
+        # Async clients for the async methods, one per event loop: clinic setup
+        # also runs these methods on a background thread's loop, and an httpx
+        # pool can't be shared across loops
+        self._ahttp_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        
+        # Initialize ElevenLabs client on an explicitly sized connection pool;
+        # SDK calls run in worker threads, and httpx.Client is safe to share
+        # across them. Idle TLS sessions are dropped after keepalive_expiry
+        self._sdk_http = httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=8, max_connections=32, keepalive_expiry=600),
+            timeout=240.0
+        )
         try:
-            self.client = ElevenLabs(api_key=self.elevenlabs_api_key)
+            self.client = ElevenLabs(api_key=self.elevenlabs_api_key, httpx_client=self._sdk_http)
         except Exception as e:
-            logger.error(f"Failed to initialize ElevenLabs client: {str(e)}")
+            logger.error("Failed to initialize ElevenLabs client: %s", e)
             self.client = None
     
+    def warm_connection(self):
+        """
+        Establish a pooled connection to ElevenLabs so the first real request
+        (often an outbound call) doesn't pay DNS + TCP + TLS setup; failures are
+        ignored. Started from the app lifespan, not at import
+        """
+        try:
+            self.http.head(f"{self.base_url}/convai/agents", timeout=2)
+        except Exception as e:
+            logger.debug("ElevenLabs connection pre-warm failed: %s", e)
+    
+    def close(self):
+        """Close the pooled HTTP session and the SDK's connection pool"""
+        self.http.close()
+        self._sdk_http.close()
+    
+    @property
+    def ahttp(self) -> httpx.AsyncClient:
+        """Async client bound to the running event loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        client = self._ahttp_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._file_upload_headers,
+                transport=_RateLimitRetryTransport(httpx.AsyncHTTPTransport(
+                    http2=True,
+                    limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+                )),
+                timeout=10.0
+            )
+            self._ahttp_clients[loop] = client
+        return client
+    
+    async def aclose(self):
+        """Close the async HTTP client for the running event loop"""
+        client = self._ahttp_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+    
+    def _load_clinic(self, db: Session, clinic_id: int) -> Optional[ClinicAgentInfo]:
+        """
+        Load the clinic columns agent setup reads, cached for CLINIC_INFO_CACHE_TTL
+        seconds so bulk outbound calls for one clinic don't re-select it each time
+        """
+        with self._clinic_cache_lock:
+            cached = self._clinic_cache.get(clinic_id)
+        if cached is not None:
+            return cached
+        
+        row = db.query(
+            Clinic.id,
+            Clinic.name,
+            Clinic.elevenlabs_agent_id,
+            Clinic.elevenlabs_agent_name,
+            Clinic.twilio_phone_number,
+            Clinic.twilio_phone_sid,
+            Clinic.ai_voice_id,
+            Clinic.ai_personality,
+            Clinic.greeting_message,
+            Clinic.knowledge_base_id,
+            Clinic.elevenlabs_phone_id
+        ).filter(Clinic.id == clinic_id).first()
+        if row is None:
+            return None
+        
+        clinic = ClinicAgentInfo(*row)
+        with self._clinic_cache_lock:
+            self._clinic_cache[clinic_id] = clinic
+        return clinic
+    
+    def invalidate_clinic(self, clinic_id: int):
+        """Drop a clinic from the info cache after its row changes"""
+        with self._clinic_cache_lock:
+            self._clinic_cache.pop(clinic_id, None)
+    
+    def _set_clinic_knowledge_base(self, db: Session, clinic_id: int, knowledge_base_id: str):
+        """Record the clinic's knowledge base ID and refresh its cached info"""
+        db.query(Clinic).filter(Clinic.id == clinic_id).update(
+            {Clinic.knowledge_base_id: knowledge_base_id}, synchronize_session=False
+        )
+        db.commit()
+        self.invalidate_clinic(clinic_id)
+    
+    def _set_clinic_phone_id(self, db: Session, clinic_id: int, phone_id: str):
+        """Store the clinic's ElevenLabs phone number ID in the session; the caller commits"""
+        db.query(Clinic).filter(Clinic.id == clinic_id).update(
+            {Clinic.elevenlabs_phone_id: phone_id}, synchronize_session=False
+        )
+        self.invalidate_clinic(clinic_id)
+    
+    @staticmethod
+    def _agent_info(clinic: ClinicAgentInfo) -> Dict[str, Any]:
+        """Agent information dictionary returned by the agent lookup and creation methods"""
+        return {
+            "clinic_id": clinic.id,
+            "clinic_name": clinic.name,
+            "agent_id": clinic.elevenlabs_agent_id,
+            "agent_name": clinic.elevenlabs_agent_name,
+            "twilio_phone_number": clinic.twilio_phone_number,
+            "twilio_phone_sid": clinic.twilio_phone_sid,
+            "ai_voice_id": clinic.ai_voice_id,
+            "ai_personality": clinic.ai_personality,
+            "greeting_message": clinic.greeting_message,
+            "elevenlabs_phone_id": clinic.elevenlabs_phone_id
+        }
+    
     def get_clinic_agent_info(self, db: Session, clinic_id: int) -> Optional[Dict[str, Any]]:
         """
         Get ElevenLabs agent information for a clinic
@@ -55,29 +353,19 @@ class AgentSetupService:
             Dictionary with agent information or None if not found
         """
         try:
-            clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
+            clinic = self._load_clinic(db, clinic_id)
             if not clinic:
-                logger.error(f"Clinic {clinic_id} not found")
+                logger.error("Clinic %s not found", clinic_id)
                 return None
             
             if not clinic.elevenlabs_agent_id:
-                logger.warning(f"Clinic {clinic_id} does not have an ElevenLabs agent configured")
+                logger.warning("Clinic %s does not have an ElevenLabs agent configured", clinic_id)
                 return None
             
-            return {
-                "clinic_id": clinic.id,
-                "clinic_name": clinic.name,
-                "agent_id": clinic.elevenlabs_agent_id,
-                "agent_name": clinic.elevenlabs_agent_name,
-                "twilio_phone_number": clinic.twilio_phone_number,
-                "twilio_phone_sid": clinic.twilio_phone_sid,
-                "ai_voice_id": clinic.ai_voice_id,
-                "ai_personality": clinic.ai_personality,
-                "greeting_message": clinic.greeting_message
-            }
+            return self._agent_info(clinic)
             
         except Exception as e:
-            logger.error(f"Error getting clinic agent info for clinic {clinic_id}: {str(e)}")
+            logger.error("Error getting clinic agent info for clinic %s: %s", clinic_id, e)
             return None
     
     def create_agent_for_clinic(self, db: Session, clinic_id: int, agent_name: str = None) -> Optional[Dict[str, Any]]:
@@ -93,14 +381,26 @@ class AgentSetupService:
             Dictionary with agent details or None if failed
         """
         try:
-            clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
+            # Fast path: a cached clinic that already has an agent is answered
+            # without touching the database
+            with self._clinic_cache_lock:
+                clinic = self._clinic_cache.get(clinic_id)
+            if clinic is not None and clinic.elevenlabs_agent_id:
+                logger.info("Clinic %s already has an agent: %s", clinic_id, clinic.elevenlabs_agent_id)
+                return self._agent_info(clinic)
+            
+            # Otherwise read the row fresh: a stale cached entry without an agent ID
+            # would create a duplicate agent. One SELECT serves both the existence
+            # check and the "already has an agent" answer
+            self.invalidate_clinic(clinic_id)
+            clinic = self._load_clinic(db, clinic_id)
             if not clinic:
-                logger.error(f"Clinic {clinic_id} not found")
+                logger.error("Clinic %s not found", clinic_id)
                 return None
             
             if clinic.elevenlabs_agent_id:
-                logger.info(f"Clinic {clinic_id} already has an agent: {clinic.elevenlabs_agent_id}")
-                return self.get_clinic_agent_info(db, clinic_id)
+                logger.info("Clinic %s already has an agent: %s", clinic_id, clinic.elevenlabs_agent_id)
+                return self._agent_info(clinic)
             
             # Default agent configuration
             agent_config = {
@@ -113,40 +413,40 @@ class AgentSetupService:
             }
             
             # Create the agent
-            response = requests.post(
+            response = self.http.post(
                 f"{self.base_url}/convai/agents/create",
-                headers=self.headers,
                 json=agent_config
             )
             
             if response.status_code in [200, 201]:
                 agent_data = response.json()
                 agent_id = agent_data.get("agent_id")
+                clinic = replace(
+                    clinic,
+                    elevenlabs_agent_id=agent_id,
+                    elevenlabs_agent_name=agent_name or f"{clinic.name} AI Assistant"
+                )
                 
                 # Update clinic with agent information
-                clinic.elevenlabs_agent_id = agent_id
-                clinic.elevenlabs_agent_name = agent_name or f"{clinic.name} AI Assistant"
+                db.query(Clinic).filter(Clinic.id == clinic_id).update(
+                    {
+                        Clinic.elevenlabs_agent_id: clinic.elevenlabs_agent_id,
+                        Clinic.elevenlabs_agent_name: clinic.elevenlabs_agent_name
+                    },
+                    synchronize_session=False
+                )
                 db.commit()
+                self.invalidate_clinic(clinic_id)
                 
-                logger.info(f"Successfully created ElevenLabs agent {agent_id} for clinic {clinic_id}")
+                logger.info("Successfully created ElevenLabs agent %s for clinic %s", agent_id, clinic_id)
                 
-                return {
-                    "clinic_id": clinic.id,
-                    "clinic_name": clinic.name,
-                    "agent_id": agent_id,
-                    "agent_name": clinic.elevenlabs_agent_name,
-                    "twilio_phone_number": clinic.twilio_phone_number,
-                    "twilio_phone_sid": clinic.twilio_phone_sid,
-                    "ai_voice_id": clinic.ai_voice_id,
-                    "ai_personality": clinic.ai_personality,
-                    "greeting_message": clinic.greeting_message
-                }
+                return self._agent_info(clinic)
             else:
-                logger.error(f"Failed to create ElevenLabs agent. Status: {response.status_code}, Response: {response.text}")
+                logger.error("Failed to create ElevenLabs agent. Status: %s, Response: %s", response.status_code, response.text)
                 return None
                 
         except Exception as e:
-            logger.error(f"Error creating agent for clinic {clinic_id}: {str(e)}")
+            logger.error("Error creating agent for clinic %s: %s", clinic_id, e)
             db.rollback()
             return None
     
@@ -171,11 +471,11 @@ class AgentSetupService:
             # Get clinic agent information
             agent_info = self.get_clinic_agent_info(db, clinic_id)
             if not agent_info:
-                logger.error(f"Cannot make outbound call: clinic {clinic_id} has no agent configured")
+                logger.error("Cannot make outbound call: clinic %s has no agent configured", clinic_id)
                 return None
             
             if not agent_info.get("twilio_phone_number"):
-                logger.error(f"Cannot make outbound call: clinic {clinic_id} has no Twilio phone number")
+                logger.error("Cannot make outbound call: clinic %s has no Twilio phone number", clinic_id)
                 return None
             
             # Create call record in database
@@ -189,14 +489,29 @@ class AgentSetupService:
                 ended_at=None
             )
             db.add(call_record)
-            db.flush()  # Get the ID without committing
             
-            # First, we need to get the ElevenLabs phone number ID
+            # The ElevenLabs phone number ID is stored on the clinic once known.
             # The twilio_phone_sid is the Twilio SID, not the ElevenLabs phone number ID
-            elevenlabs_phone_id = await self._get_elevenlabs_phone_id(agent_info["twilio_phone_number"])
+            elevenlabs_phone_id = agent_info.get("elevenlabs_phone_id")
+            if elevenlabs_phone_id:
+                db.flush()  # Get the ID without committing
+            else:
+                # The lookup does not depend on the insert, so flush while it is in
+                # flight; return_exceptions lets both finish before any rollback
+                # touches the session
+                elevenlabs_phone_id, flushed = await asyncio.gather(
+                    self._get_elevenlabs_phone_id(agent_info["twilio_phone_number"]),
+                    asyncio.to_thread(db.flush),
+                    return_exceptions=True
+                )
+                for result in (flushed, elevenlabs_phone_id):
+                    if isinstance(result, BaseException):
+                        raise result
+                if elevenlabs_phone_id:
+                    self._set_clinic_phone_id(db, clinic_id, elevenlabs_phone_id)
             
             if not elevenlabs_phone_id:
-                logger.error(f"Cannot make outbound call: phone number {agent_info['twilio_phone_number']} not found in ElevenLabs")
+                logger.error("Cannot make outbound call: phone number %s not found in ElevenLabs", agent_info['twilio_phone_number'])
                 call_record.status = CallStatus.FAILED
                 db.commit()
                 return None
@@ -211,7 +526,9 @@ class AgentSetupService:
             # Make the outbound call
             if self.client:
                 try:
-                    response = self.client.conversational_ai.twilio.outbound_call(**call_data)
+                    response = await asyncio.to_thread(
+                        self.client.conversational_ai.twilio.outbound_call, **call_data
+                    )
                     
                     # Update call record with response data
                     if response and hasattr(response, 'conversation_id'):
@@ -219,11 +536,11 @@ class AgentSetupService:
                         call_record.twilio_call_sid = getattr(response, 'callSid', None)
                         call_record.conversation_id = conversation_id  # Store ElevenLabs conversation ID
                         call_record.status = CallStatus.IN_PROGRESS
-                        call_record.started_at = db.query(func.now()).scalar()
+                        call_record.started_at = datetime.now(timezone.utc)
                         
                         db.commit()
                         
-                        logger.info(f"Successfully initiated outbound call {call_record.id} for clinic {clinic_id} with conversation_id {conversation_id}")
+                        logger.info("Successfully initiated outbound call %s for clinic %s with conversation_id %s", call_record.id, clinic_id, conversation_id)
                         
                         return {
                             "call_id": call_record.id,
@@ -235,13 +552,13 @@ class AgentSetupService:
                             "call_type": call_record.call_type.value
                         }
                     else:
-                        logger.error(f"Invalid response from ElevenLabs outbound call API")
+                        logger.error("Invalid response from ElevenLabs outbound call API")
                         call_record.status = CallStatus.FAILED
                         db.commit()
                         return None
                         
                 except Exception as e:
-                    logger.error(f"ElevenLabs API error making outbound call: {str(e)}")
+                    logger.error("ElevenLabs API error making outbound call: %s", e)
                     call_record.status = CallStatus.FAILED
                     db.commit()
                     return None
@@ -252,7 +569,7 @@ class AgentSetupService:
                 return None
                 
         except Exception as e:
-            logger.error(f"Error making outbound call for clinic {clinic_id}: {str(e)}")
+            logger.error("Error making outbound call for clinic %s: %s", clinic_id, e)
             db.rollback()
             return None
     
@@ -268,28 +585,15 @@ class AgentSetupService:
             Dictionary with call status or None if not found
         """
         try:
-            call = db.query(Call).filter(Call.id == call_id).first()
+            call = db.query(*_CALL_COLUMNS).filter(Call.id == call_id).first()
             if not call:
-                logger.error(f"Call {call_id} not found")
+                logger.error("Call %s not found", call_id)
                 return None
             
-            return {
-                "call_id": call.id,
-                "status": call.status.value,
-                "call_type": call.call_type.value,
-                "from_number": call.from_number,
-                "to_number": call.to_number,
-                "duration_seconds": call.duration_seconds,
-                "started_at": call.started_at,
-                "ended_at": call.ended_at,
-                "twilio_call_sid": call.twilio_call_sid,
-                "outcome": call.outcome,
-                "handoff_to_human": call.handoff_to_human,
-                "patient_satisfaction": call.patient_satisfaction
-            }
+            return _call_dict(call, _CALL_KEYS)
             
         except Exception as e:
-            logger.error(f"Error getting call status for call {call_id}: {str(e)}")
+            logger.error("Error getting call status for call %s: %s", call_id, e)
             return None
     
     def list_clinic_calls(
@@ -299,7 +603,9 @@ class AgentSetupService:
         limit: int = 50, 
         offset: int = 0,
         call_type: CallType = None,
-        status: CallStatus = None
+        status: CallStatus = None,
+        before_created_at: Optional[datetime] = None,
+        before_id: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """
         List calls for a clinic with optional filtering
@@ -308,15 +614,17 @@ class AgentSetupService:
             db: Database session
             clinic_id: ID of the clinic
             limit: Maximum number of calls to return
-            offset: Number of calls to skip
+            offset: Number of calls to skip, only used without a cursor
             call_type: Optional filter by call type
             status: Optional filter by call status
+            before_created_at: Keyset cursor, created_at of the last call already seen
+            before_id: Keyset cursor, id of the last call already seen
             
         Returns:
             List of call dictionaries
         """
         try:
-            query = db.query(Call).filter(Call.clinic_id == clinic_id)
+            query = db.query(*_CALL_LIST_COLUMNS).filter(Call.clinic_id == clinic_id)
             
             if call_type:
                 query = query.filter(Call.call_type == call_type)
@@ -324,29 +632,20 @@ class AgentSetupService:
             if status:
                 query = query.filter(Call.status == status)
             
-            calls = query.order_by(Call.created_at.desc()).offset(offset).limit(limit).all()
-            
-            return [
-                {
-                    "call_id": call.id,
-                    "status": call.status.value,
-                    "call_type": call.call_type.value,
-                    "from_number": call.from_number,
-                    "to_number": call.to_number,
-                    "duration_seconds": call.duration_seconds,
-                    "started_at": call.started_at,
-                    "ended_at": call.ended_at,
-                    "twilio_call_sid": call.twilio_call_sid,
-                    "outcome": call.outcome,
-                    "handoff_to_human": call.handoff_to_human,
-                    "patient_satisfaction": call.patient_satisfaction,
-                    "created_at": call.created_at
-                }
-                for call in calls
-            ]
+            query = query.order_by(Call.created_at.desc(), Call.id.desc())
+            if before_created_at is not None and before_id is not None:
+                # Keyset pagination: an index range scan on ix_calls_clinic_created_id
+                # instead of scanning and discarding `offset` rows
+                query = query.filter(tuple_(Call.created_at, Call.id) < tuple_(before_created_at, before_id))
+            elif offset:
+                query = query.offset(offset)
+            
+            calls = query.limit(limit).all()
+            
+            return [_call_dict(call, _CALL_LIST_KEYS) for call in calls]
             
         except Exception as e:
-            logger.error(f"Error listing calls for clinic {clinic_id}: {str(e)}")
+            logger.error("Error listing calls for clinic %s: %s", clinic_id, e)
             return []
     
     def get_clinic_twilio_number(self, db: Session, clinic_id: int) -> Optional[str]:
@@ -361,15 +660,15 @@ class AgentSetupService:
             Twilio phone number string or None if not found
         """
         try:
-            clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
+            clinic = self._load_clinic(db, clinic_id)
             if not clinic:
-                logger.error(f"Clinic {clinic_id} not found")
+                logger.error("Clinic %s not found", clinic_id)
                 return None
             
             return clinic.twilio_phone_number
             
         except Exception as e:
-            logger.error(f"Error getting Twilio number for clinic {clinic_id}: {str(e)}")
+            logger.error("Error getting Twilio number for clinic %s: %s", clinic_id, e)
             return None
 
     async def upload_document_to_knowledge_base(
@@ -390,40 +689,35 @@ class AgentSetupService:
             Dictionary with upload details or None if failed
         """
         try:
-            clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
+            clinic = self._load_clinic(db, clinic_id)
             if not clinic:
-                logger.error(f"Clinic {clinic_id} not found")
+                logger.error("Clinic %s not found", clinic_id)
                 return None
             
             if not clinic.elevenlabs_agent_id:
-                logger.error(f"Clinic {clinic_id} has no agent configured")
+                logger.error("Clinic %s has no agent configured", clinic_id)
                 return None
             
             # Check if agent already has a knowledge base
-            existing_kb_id = await self._ensure_agent_knowledge_base(clinic.elevenlabs_agent_id)
+            existing_kb_id, agent_config = await self._ensure_agent_knowledge_base(clinic.elevenlabs_agent_id)
             
             # Upload document using the correct ElevenLabs API
             try:
-                # Read the file content
-                with open(file_path, 'rb') as file:
-                    # Determine the correct MIME type based on file extension
-                    file_extension = os.path.splitext(file_path)[1].lower()
-                    mime_type = {
-                        '.pdf': 'application/pdf',
-                        '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                        '.doc': 'application/msword',
-                        '.txt': 'text/plain',
-                        '.html': 'text/html',
-                        '.epub': 'application/epub+zip'
-                    }.get(file_extension, 'application/octet-stream')
-                    
+                # Determine the correct MIME type based on file extension
+                file_extension = os.path.splitext(file_path)[1].lower()
+                mime_type = _MIME_TYPES.get(file_extension, 'application/octet-stream')
+                
+                # httpx streams the open file in fixed-size chunks rather than
+                # buffering the whole document; opening happens off the event loop
+                file = await asyncio.to_thread(open, file_path, 'rb')
+                with file:
                     files = {'file': (os.path.basename(file_path), file, mime_type)}
                     
                     # Use the correct endpoint for uploading files to knowledge base
-                    response = requests.post(
-                        f"{self.base_url}/convai/knowledge-base/file",
-                        headers={"xi-api-key": self.elevenlabs_api_key},
-                        files=files
+                    response = await self.ahttp.post(
+                        "/convai/knowledge-base/file",
+                        files=files,
+                        timeout=UPLOAD_TIMEOUT
                     )
                     
                     if response.status_code == 200:
@@ -437,21 +731,20 @@ class AgentSetupService:
                         if knowledge_base_id and not existing_kb_id:
                             try:
                                 # Update the agent to use this knowledge base using the correct API structure
-                                success = await self._assign_knowledge_base_to_agent(clinic.elevenlabs_agent_id, knowledge_base_id)
+                                success = await self._assign_knowledge_base_to_agent(clinic.elevenlabs_agent_id, knowledge_base_id, agent_config)
                                 if success:
-                                    logger.info(f"Successfully associated knowledge base {knowledge_base_id} with agent {clinic.elevenlabs_agent_id}")
+                                    logger.info("Successfully associated knowledge base %s with agent %s", knowledge_base_id, clinic.elevenlabs_agent_id)
                                 else:
-                                    logger.warning(f"Failed to associate knowledge base {knowledge_base_id} with agent {clinic.elevenlabs_agent_id}")
+                                    logger.warning("Failed to associate knowledge base %s with agent %s", knowledge_base_id, clinic.elevenlabs_agent_id)
                             except Exception as e:
-                                logger.warning(f"Error associating knowledge base with agent: {str(e)}")
+                                logger.warning("Error associating knowledge base with agent: %s", e)
                         
                         # Update clinic's knowledge base ID if we have one
                         if knowledge_base_id and not clinic.knowledge_base_id:
-                            clinic.knowledge_base_id = knowledge_base_id
-                            db.commit()
-                            logger.info(f"Updated clinic {clinic_id} knowledge_base_id to {knowledge_base_id}")
+                            self._set_clinic_knowledge_base(db, clinic_id, knowledge_base_id)
+                            logger.info("Updated clinic %s knowledge_base_id to %s", clinic_id, knowledge_base_id)
                         
-                        logger.info(f"Successfully uploaded document for clinic {clinic_id}. Response: {response_data}")
+                        logger.info("Successfully uploaded document for clinic %s. Response: %s", clinic_id, response_data)
                         
                         return {
                             "document_id": document_id,
@@ -463,15 +756,15 @@ class AgentSetupService:
                             "elevenlabs_response": response_data  # Full JSON response from ElevenLabs
                         }
                     else:
-                        logger.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+                        logger.error("ElevenLabs API error: %s - %s", response.status_code, response.text)
                         return None
                         
             except Exception as e:
-                logger.error(f"ElevenLabs API error uploading document: {str(e)}")
+                logger.error("ElevenLabs API error uploading document: %s", e)
                 return None
                 
         except Exception as e:
-            logger.error(f"Error uploading document for clinic {clinic_id}: {str(e)}")
+            logger.error("Error uploading document for clinic %s: %s", clinic_id, e)
             return None
 
     async def create_knowledge_base_from_text(
@@ -492,23 +785,22 @@ class AgentSetupService:
             Dictionary with upload details or None if failed
         """
         try:
-            clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
+            clinic = self._load_clinic(db, clinic_id)
             if not clinic:
-                logger.error(f"Clinic {clinic_id} not found")
+                logger.error("Clinic %s not found", clinic_id)
                 return None
             if not clinic.elevenlabs_agent_id:
-                logger.error(f"Clinic {clinic_id} has no agent configured")
+                logger.error("Clinic %s has no agent configured", clinic_id)
                 return None
 
-            existing_kb_id = await self._ensure_agent_knowledge_base(clinic.elevenlabs_agent_id)
+            existing_kb_id, agent_config = await self._ensure_agent_knowledge_base(clinic.elevenlabs_agent_id)
 
             payload = {"text": text}
             if name:
                 payload["name"] = name
 
-            response = requests.post(
-                f"{self.base_url}/convai/knowledge-base/text",
-                headers={"xi-api-key": self.elevenlabs_api_key, "Content-Type": "application/json"},
+            response = await self.ahttp.post(
+                "/convai/knowledge-base/text",
                 json=payload
             )
 
@@ -520,21 +812,20 @@ class AgentSetupService:
                 # If we got a knowledge base ID and the agent doesn't have one, update the agent
                 if knowledge_base_id and not existing_kb_id:
                     try:
-                        success = await self._assign_knowledge_base_to_agent(clinic.elevenlabs_agent_id, knowledge_base_id)
+                        success = await self._assign_knowledge_base_to_agent(clinic.elevenlabs_agent_id, knowledge_base_id, agent_config)
                         if success:
-                            logger.info(f"Successfully associated knowledge base {knowledge_base_id} with agent {clinic.elevenlabs_agent_id}")
+                            logger.info("Successfully associated knowledge base %s with agent %s", knowledge_base_id, clinic.elevenlabs_agent_id)
                         else:
-                            logger.warning(f"Failed to associate knowledge base {knowledge_base_id} with agent {clinic.elevenlabs_agent_id}")
+                            logger.warning("Failed to associate knowledge base %s with agent %s", knowledge_base_id, clinic.elevenlabs_agent_id)
                     except Exception as e:
-                        logger.warning(f"Error associating knowledge base with agent: {str(e)}")
+                        logger.warning("Error associating knowledge base with agent: %s", e)
 
                 # Update clinic's knowledge base ID if we have one
                 if knowledge_base_id and not clinic.knowledge_base_id:
-                    clinic.knowledge_base_id = knowledge_base_id
-                    db.commit()
-                    logger.info(f"Updated clinic {clinic_id} knowledge_base_id to {knowledge_base_id}")
+                    self._set_clinic_knowledge_base(db, clinic_id, knowledge_base_id)
+                    logger.info("Updated clinic %s knowledge_base_id to %s", clinic_id, knowledge_base_id)
 
-                logger.info(f"Successfully created knowledge base from text for clinic {clinic_id}. Response: {response_data}")
+                logger.info("Successfully created knowledge base from text for clinic %s. Response: %s", clinic_id, response_data)
                 return {
                     "document_id": document_id,
                     "clinic_id": clinic_id,
@@ -544,13 +835,41 @@ class AgentSetupService:
                     "elevenlabs_response": response_data  # Full JSON response from ElevenLabs
                 }
             else:
-                logger.error(f"ElevenLabs API error: {response.status_code} - {response.text}")
+                logger.error("ElevenLabs API error: %s - %s", response.status_code, response.text)
                 return None
         except Exception as e:
-            logger.error(f"Error creating knowledge base from text for clinic {clinic_id}: {str(e)}")
+            logger.error("Error creating knowledge base from text for clinic %s: %s", clinic_id, e)
             return None
 
-    async def _ensure_agent_knowledge_base(self, agent_id: str) -> Optional[str]:
+    async def _get_agent_config(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Get an agent's configuration, reusing a fetch from the last
+        AGENT_CONFIG_CACHE_TTL seconds so sibling uploads share one GET;
+        older copies are revalidated with If-None-Match
+        """
+        cached = self._agent_cfg_cache.get(agent_id)
+        if cached and time.monotonic() - cached[0] < AGENT_CONFIG_CACHE_TTL:
+            return cached[1]
+        
+        validator = self._agent_etags.get(agent_id)
+        headers = {"If-None-Match": validator[0]} if validator else None
+        response = await self.ahttp.get(f"/convai/agents/{agent_id}", headers=headers)
+        
+        if response.status_code == 304 and validator:
+            agent_config = validator[1]
+        elif response.status_code == 200:
+            agent_config = response.json()
+            etag = response.headers.get("ETag")
+            if etag:
+                self._agent_etags[agent_id] = (etag, agent_config)
+        else:
+            logger.error("Failed to get agent configuration: %s - %s", response.status_code, response.text)
+            return None
+        
+        self._agent_cfg_cache[agent_id] = (time.monotonic(), agent_config)
+        return agent_config
+
+    async def _ensure_agent_knowledge_base(self, agent_id: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
         """
         Ensure the agent has a knowledge base configured
         
@@ -558,60 +877,52 @@ class AgentSetupService:
             agent_id: ElevenLabs agent ID
             
         Returns:
-            Knowledge base ID or None if failed
+            Tuple of (knowledge base ID or None, agent configuration or None),
+            the configuration being reusable by _assign_knowledge_base_to_agent
         """
         try:
             # First, try to get the agent's current configuration
-            response = requests.get(
-                f"{self.base_url}/convai/agents/{agent_id}",
-                headers={"xi-api-key": self.elevenlabs_api_key}
-            )
+            agent_config = await self._get_agent_config(agent_id)
             
-            if response.status_code == 200:
-                agent_data = response.json()
-                # Check if agent already has knowledge base configured
-                if agent_data.get('knowledge_base_id'):
-                    return agent_data['knowledge_base_id']
+            # Check if agent already has knowledge base configured
+            if agent_config and agent_config.get('knowledge_base_id'):
+                return agent_config['knowledge_base_id'], agent_config
             
             # If no knowledge base exists, we'll create one when we upload the first file
             # The knowledge base is created automatically when uploading files
-            logger.info(f"No existing knowledge base found for agent {agent_id}, will create one with first file upload")
-            return None
+            logger.info("No existing knowledge base found for agent %s, will create one with first file upload", agent_id)
+            return None, agent_config
                 
         except Exception as e:
-            logger.error(f"Error checking agent knowledge base: {str(e)}")
-            return None
+            logger.error("Error checking agent knowledge base: %s", e)
+            return None, None
 
-    async def _assign_knowledge_base_to_agent(self, agent_id: str, knowledge_base_id: str) -> bool:
+    async def _assign_knowledge_base_to_agent(
+        self,
+        agent_id: str,
+        knowledge_base_id: str,
+        agent_config: Optional[Dict[str, Any]] = None
+    ) -> bool:
         """
         Assign a knowledge base to an agent using the correct ElevenLabs API structure
         
         Args:
             agent_id: ElevenLabs agent ID
             knowledge_base_id: ElevenLabs knowledge base ID
+            agent_config: Agent configuration already fetched by the caller, if any
             
         Returns:
             True if successful, False otherwise
         """
         try:
-            headers = {
-                "Accept": "application/json",
-                "xi-api-key": self.elevenlabs_api_key,
-                "Content-Type": "application/json"
-            }
-            
-            # Get current agent configuration
-            get_response = requests.get(
-                f"{self.base_url}/convai/agents/{agent_id}",
-                headers=headers
-            )
-            
-            if get_response.status_code != 200:
-                logger.error(f"Failed to get agent configuration: {get_response.status_code} - {get_response.text}")
-                return False
+            # Get current agent configuration unless the caller already has it
+            if agent_config is None:
+                agent_config = await self._get_agent_config(agent_id)
+                if agent_config is None:
+                    return False
             
-            agent_config = get_response.json()
-            conversation_config = agent_config.get("conversation_config", {})
+            # Copy so the cached configuration isn't mutated
+            conversation_config = copy.deepcopy(agent_config.get("conversation_config", {}))
             
             # Ensure the agent.prompt structure exists
             if "agent" not in conversation_config:
@@ -642,23 +953,60 @@ class AgentSetupService:
                 "conversation_config": conversation_config
             }
             
-            update_response = requests.patch(
-                f"{self.base_url}/convai/agents/{agent_id}",
-                headers=headers,
+            update_response = await self.ahttp.patch(
+                f"/convai/agents/{agent_id}",
                 json=update_data
             )
             
             if update_response.status_code in [200, 201]:
-                logger.info(f"Successfully assigned knowledge base {knowledge_base_id} to agent {agent_id}")
+                self._agent_cfg_cache.pop(agent_id, None)
+                logger.info("Successfully assigned knowledge base %s to agent %s", knowledge_base_id, agent_id)
                 return True
             else:
-                logger.error(f"Failed to assign knowledge base to agent: {update_response.status_code} - {update_response.text}")
+                logger.error("Failed to assign knowledge base to agent: %s - %s", update_response.status_code, update_response.text)
                 return False
                 
         except Exception as e:
-            logger.error(f"Error assigning knowledge base to agent: {str(e)}")
+            logger.error("Error assigning knowledge base to agent: %s", e)
             return False
 
+    def _phone_lookup_lock(self) -> asyncio.Lock:
+        """Lock guarding the phone number listing, one per event loop"""
+        loop = asyncio.get_running_loop()
+        lock = self._phone_lookup_locks.get(loop)
+        if lock is None:
+            lock = self._phone_lookup_locks[loop] = asyncio.Lock()
+        return lock
+
+    def _cached_phone_id(self, phone_number: str) -> Optional[str]:
+        """Return the cached ElevenLabs phone ID if it is still within PHONE_ID_CACHE_TTL"""
+        cached = self._phone_id_cache.get(phone_number)
+        if cached and time.monotonic() - cached[0] < PHONE_ID_CACHE_TTL:
+            return cached[1]
+        return None
+    
+    async def _refresh_phone_ids(self):
+        """List every ElevenLabs phone number once and cache all of their IDs"""
+        phone_numbers = await asyncio.to_thread(self.client.conversational_ai.phone_numbers.list)
+        fetched_at = time.monotonic()
+        for phone in phone_numbers:
+            self._phone_id_cache[phone.phone_number] = (fetched_at, phone.phone_number_id)
+    
+    async def run_phone_map_refresh(self):
+        """
+        Keep the phone ID cache warm so outbound calls for any clinic resolve their
+        number from memory; reloads every PHONE_MAP_REFRESH_INTERVAL seconds
+        """
+        if not self.client:
+            return
+        while True:
+            try:
+                async with self._phone_lookup_lock():
+                    await self._refresh_phone_ids()
+            except Exception as e:
+                logger.warning("ElevenLabs phone number refresh failed: %s", e)
+            await asyncio.sleep(PHONE_MAP_REFRESH_INTERVAL)
+    
     async def _get_elevenlabs_phone_id(self, phone_number: str) -> Optional[str]:
         """
         Get the ElevenLabs phone number ID for a given phone number
@@ -674,19 +1022,27 @@ class AgentSetupService:
                 logger.error("ElevenLabs client not initialized")
                 return None
             
-            # List all phone numbers in ElevenLabs using the SDK
-            phone_numbers = self.client.conversational_ai.phone_numbers.list()
+            phone_id = self._cached_phone_id(phone_number)
+            if phone_id:
+                return phone_id
+            
+            # On a miss, refresh once; concurrent misses share a single list call
+            async with self._phone_lookup_lock():
+                phone_id = self._cached_phone_id(phone_number)
+                if phone_id:
+                    return phone_id
+                
+                await self._refresh_phone_ids()
+                phone_id = self._cached_phone_id(phone_number)
             
-            # Find the phone number that matches
-            for phone in phone_numbers:
-                if phone.phone_number == phone_number:
-                    return phone.phone_number_id
+            if phone_id:
+                return phone_id
             
-            logger.warning(f"Phone number {phone_number} not found in ElevenLabs phone numbers")
+            logger.warning("Phone number %s not found in ElevenLabs phone numbers", phone_number)
             return None
                 
         except Exception as e:
-            logger.error(f"Error getting ElevenLabs phone ID for {phone_number}: {str(e)}")
+            logger.error("Error getting ElevenLabs phone ID for %s: %s", phone_number, e)
             return None
 
     async def import_phone_number_to_elevenlabs(
@@ -716,7 +1072,8 @@ class AgentSetupService:
             # Import the phone number using the SDK
             from elevenlabs.conversational_ai.phone_numbers import PhoneNumbersCreateRequestBody_Twilio
             
-            phone_response = self.client.conversational_ai.phone_numbers.create(
+            phone_response = await asyncio.to_thread(
+                self.client.conversational_ai.phone_numbers.create,
                 request=PhoneNumbersCreateRequestBody_Twilio(
                     phone_number=phone_number,
                     label=label,
@@ -725,20 +1082,23 @@ class AgentSetupService:
                 )
             )
             
-            logger.info(f"Successfully imported phone number {phone_number} to ElevenLabs")
+            logger.info("Successfully imported phone number %s to ElevenLabs", phone_number)
+            self._phone_id_cache[phone_number] = (time.monotonic(), phone_response.phone_number_id)
             return phone_response.phone_number_id
             
         except Exception as e:
-            logger.error(f"Error importing phone number {phone_number} to ElevenLabs: {str(e)}")
+            logger.error("Error importing phone number %s to ElevenLabs: %s", phone_number, e)
             return None
 
-    async def link_phone_to_agent(self, agent_id: str, phone_number: str) -> bool:
+    async def link_phone_to_agent(self, agent_id: str, phone_number: str, fetch_existing: bool = False) -> bool:
         """
         Link a phone number to an agent
         
         Args:
             agent_id: ElevenLabs agent ID
             phone_number: Phone number to link
+            fetch_existing: Echo the agent's current conversation_config back in the
+                update; PATCH is a partial update, so this is off by default
             
         Returns:
             True if successful, False otherwise
@@ -747,75 +1107,52 @@ class AgentSetupService:
             # First, get the ElevenLabs phone number ID
             phone_id = await self._get_elevenlabs_phone_id(phone_number)
             if not phone_id:
-                logger.error(f"Cannot link phone {phone_number} to agent {agent_id}: phone not found in ElevenLabs")
+                logger.error("Cannot link phone %s to agent %s: phone not found in ElevenLabs", phone_number, agent_id)
                 return False
             
             # Update the agent to use this phone number using direct API call
             # The SDK doesn't support phone_number_id parameter, so we use direct API
-            headers = {
-                "Accept": "application/json",
-                "xi-api-key": self.elevenlabs_api_key,
-                "Content-Type": "application/json"
-            }
-            
-            # Get current agent configuration
-            get_response = requests.get(
-                f"{self.base_url}/convai/agents/{agent_id}",
-                headers=headers
-            )
-            
-            if get_response.status_code != 200:
-                logger.error(f"Failed to get agent {agent_id} configuration: {get_response.status_code}")
-                return False
-            
-            agent_config = get_response.json()
+            update_data = {"phone_number_id": phone_id}
             
-            # Update the agent configuration to include the phone number
-            update_data = {
-                "conversation_config": agent_config.get("conversation_config", {}),
-                "phone_number_id": phone_id
-            }
+            if fetch_existing:
+                agent_config = await self._get_agent_config(agent_id)
+                if agent_config is None:
+                    return False
+                update_data["conversation_config"] = agent_config.get("conversation_config", {})
             
             # Update the agent
-            update_response = requests.patch(
-                f"{self.base_url}/convai/agents/{agent_id}",
-                headers=headers,
+            update_response = await self.ahttp.patch(
+                f"/convai/agents/{agent_id}",
                 json=update_data
             )
             
             if update_response.status_code in [200, 201]:
-                logger.info(f"Successfully linked phone {phone_number} (ID: {phone_id}) to agent {agent_id}")
+                logger.info("Successfully linked phone %s (ID: %s) to agent %s", phone_number, phone_id, agent_id)
                 return True
             else:
-                logger.error(f"Failed to link phone to agent. Status: {update_response.status_code}, Response: {update_response.text}")
+                logger.error("Failed to link phone to agent. Status: %s, Response: %s", update_response.status_code, update_response.text)
                 return False
                 
         except Exception as e:
-            logger.error(f"Error linking phone {phone_number} to agent {agent_id}: {str(e)}")
+            logger.error("Error linking phone %s to agent %s: %s", phone_number, agent_id, e)
             return False
 
     def assign_phone_to_agent(self, agent_id: str, phone_number_id: str) -> bool:
         """
         Assign a phone number to an agent in ElevenLabs.
         """
-        headers = {
-            "Accept": "application/json",
-            "xi-api-key": self.elevenlabs_api_key,
-            "Content-Type": "application/json"
-        }
         data = {
             "agent_id": agent_id
         }
-        response = requests.patch(
+        response = self.http.patch(
             f"{self.base_url}/convai/phone-numbers/{phone_number_id}",
-            headers=headers,
             json=data
         )
         if response.status_code in [200, 201]:
-            logger.info(f"Successfully assigned phone number {phone_number_id} to agent {agent_id}")
+            logger.info("Successfully assigned phone number %s to agent %s", phone_number_id, agent_id)
             return True
         else:
-            logger.error(f"Failed to assign phone number. Status: {response.status_code}, Response: {response.text}")
+            logger.error("Failed to assign phone number. Status: %s, Response: %s", response.status_code, response.text)
             return False
 
     def update_agent_configuration(
@@ -844,7 +1181,7 @@ class AgentSetupService:
         try:
             clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
             if not clinic:
-                logger.error(f"Clinic {clinic_id} not found")
+                logger.error("Clinic %s not found", clinic_id)
                 return None
             
             # Update clinic fields
@@ -858,13 +1195,14 @@ class AgentSetupService:
                 clinic.greeting_message = greeting_message
             
             db.commit()
+            self.invalidate_clinic(clinic_id)
             
-            logger.info(f"Successfully updated agent configuration for clinic {clinic_id}")
+            logger.info("Successfully updated agent configuration for clinic %s", clinic_id)
             
             return self.get_clinic_agent_info(db, clinic_id)
             
         except Exception as e:
-            logger.error(f"Error updating agent configuration for clinic {clinic_id}: {str(e)}")
+            logger.error("Error updating agent configuration for clinic %s: %s", clinic_id, e)
             db.rollback()
             return None
 
@@ -878,18 +1216,17 @@ class AgentSetupService:
             The updated agent data (dict) or error info
         """
         try:
-            response = requests.patch(
+            response = self.http.patch(
                 f"{self.base_url}/convai/agents/{agent_id}",
-                headers=self.headers,
                 json=config
             )
             if response.status_code in [200, 201]:
                 return response.json()
             else:
-                logger.error(f"Failed to update agent config: {response.status_code} - {response.text}")
+                logger.error("Failed to update agent config: %s - %s", response.status_code, response.text)
                 return {"error": response.text, "status_code": response.status_code}
         except Exception as e:
-            logger.error(f"Exception updating agent config: {str(e)}")
+            logger.error("Exception updating agent config: %s", e)
             return {"error": str(e)}
 
     def update_agent_data_collection(self, agent_id: str, data_collection_config: dict) -> dict:
@@ -903,18 +1240,17 @@ class AgentSetupService:
         """
         try:
             patch_data = {"data_collection": data_collection_config}
-            response = requests.patch(
+            response = self.http.patch(
                 f"{self.base_url}/convai/agents/{agent_id}",
-                headers=self.headers,
                 json=patch_data
             )
             if response.status_code in [200, 201]:
                 return response.json()
             else:
-                logger.error(f"Failed to update agent data collection: {response.status_code} - {response.text}")
+                logger.error("Failed to update agent data collection: %s - %s", response.status_code, response.text)
                 return {"error": response.text, "status_code": response.status_code}
         except Exception as e:
-            logger.error(f"Exception updating agent data collection: {str(e)}")
+            logger.error("Exception updating agent data collection: %s", e)
             return {"error": str(e)}
 
 
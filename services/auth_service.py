@@ -4,16 +4,23 @@ Handles JWT token creation, validation, and clinic access control
 """
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+import jwt
+import bcrypt
+from sqlalchemy import case, or_
+from sqlalchemy.orm import Session, load_only
 from fastapi import HTTPException, status
 from models import Clinic, Staff, Admin
 import os
 from dotenv import load_dotenv
 import asyncio
 from services.setup_service import clinic_setup_service
-import random
+import hmac
+from hashlib import blake2b, sha256
+from secrets import randbelow
+from cachetools import TTLCache
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
@@ -22,8 +29,72 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing: native bcrypt. 12 rounds (2^12 key-expansion iterations) costs
+# on the order of 200-300ms per hash or verify on one core, which is the whole
+# price of a login; existing passlib "$2b$" hashes verify unchanged
+BCRYPT_ROUNDS = 12
+
+# bcrypt only uses the first 72 bytes of a password; passlib truncated silently
+_BCRYPT_MAX_BYTES = 72
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode("utf-8")[:_BCRYPT_MAX_BYTES]
+
+def _hash_password(password: str) -> str:
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
+
+# Compared against when no account matches, so a missing email costs the same
+# bcrypt work as a wrong password and cannot be detected by timing
+_DUMMY_PASSWORD_HASH = _hash_password("dummy-password-for-timing")
+
+# Recent login outcomes keyed by a digest of (user type, email, password), so an
+# immediate resubmit skips bcrypt. Holds the user id on success or _LOGIN_MISS.
+_login_cache = TTLCache(maxsize=5000, ttl=10)
+_LOGIN_MISS = object()
+
+def _hash_otp(otp: str) -> str:
+    """
+    Stored form of an email verification code; the plaintext is never persisted.
+    Keyed with SECRET_KEY, since a bare hash of a 6-digit code is reversed by
+    hashing all 10^6 candidates
+    """
+    return hmac.new(SECRET_KEY.encode(), otp.encode(), sha256).hexdigest()
+
+def _login_cache_key(user_type: str, email: str, password: str) -> bytes:
+    """Short digest of the login attempt; no plaintext password is retained"""
+    return blake2b(f"{user_type}|{email}|{password}".encode(), digest_size=16).digest()
+
+# Background clinic setup (Twilio number + ElevenLabs agent) runs on a bounded pool
+_setup_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="clinic-setup")
+
+# One long-lived event loop for the setup coroutines, so every setup shares the
+# same async HTTP clients and their keep-alive connections instead of building
+# and tearing down a loop per registration. Started on the first registration,
+# not at import, and only awaits I/O: blocking DB work is sent to threads
+_setup_loop: Optional[asyncio.AbstractEventLoop] = None
+_setup_loop_lock = threading.Lock()
+
+def _get_setup_loop() -> asyncio.AbstractEventLoop:
+    global _setup_loop
+    with _setup_loop_lock:
+        if _setup_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="clinic-setup-loop", daemon=True).start()
+            _setup_loop = loop
+    return _setup_loop
+
+# Columns a login reads: credentials plus the claims put in the access token
+_CLINIC_LOGIN_COLUMNS = (Clinic.id, Clinic.email, Clinic.name, Clinic.password_hash, Clinic.is_active)
+_STAFF_LOGIN_COLUMNS = (
+    Staff.id, Staff.email, Staff.clinic_id, Staff.role, Staff.first_name, Staff.last_name,
+    Staff.password_hash, Staff.is_active
+)
+
+# Decoded JWT payloads keyed by the raw token, so the several dependencies that
+# validate one request's token share a single decode
+TOKEN_CACHE_TTL = 30
+_token_cache = TTLCache(maxsize=4096, ttl=TOKEN_CACHE_TTL)
+_token_cache_lock = threading.Lock()
 
 class AuthService:
     """Authentication service for clinic management"""
@@ -32,14 +103,19 @@ class AuthService:
         self.secret_key = SECRET_KEY
         self.algorithm = ALGORITHM
         self.access_token_expire_minutes = ACCESS_TOKEN_EXPIRE_MINUTES
+        # Key bytes, header and algorithm list built once rather than per token
+        self._signing_key = self.secret_key.encode()
+        self._jwt_headers = {"alg": self.algorithm, "typ": "JWT"}
+        self._jwt_algorithms = [self.algorithm]
+        self._jwt = jwt.PyJWT()
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a plain password against its hash"""
-        return pwd_context.verify(plain_password, hashed_password)
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode("utf-8"))
     
     def get_password_hash(self, password: str) -> str:
         """Hash a password"""
-        return pwd_context.hash(password)
+        return _hash_password(password)
     
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
         """Create JWT access token"""
@@ -50,15 +126,25 @@ class AuthService:
             expire = datetime.utcnow() + timedelta(minutes=self.access_token_expire_minutes)
         
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+        encoded_jwt = self._jwt.encode(to_encode, self._signing_key, algorithm=self.algorithm, headers=self._jwt_headers)
         return encoded_jwt
     
     def verify_token(self, token: str) -> Dict[str, Any]:
         """Verify and decode JWT token"""
+        with _token_cache_lock:
+            payload = _token_cache.get(token)
+        if payload is not None:
+            return payload
+        
         try:
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+            payload = self._jwt.decode(token, self._signing_key, algorithms=self._jwt_algorithms)
+            # Only cache tokens that stay valid for the whole cache lifetime
+            exp = payload.get("exp")
+            if isinstance(exp, (int, float)) and exp - time.time() > TOKEN_CACHE_TTL:
+                with _token_cache_lock:
+                    _token_cache[token] = payload
             return payload
-        except JWTError:
+        except jwt.PyJWTError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
@@ -67,29 +153,60 @@ class AuthService:
     
     def authenticate_clinic(self, db: Session, email: str, password: str) -> Optional[Clinic]:
         """Authenticate clinic by email and password"""
-        clinic = db.query(Clinic).filter(Clinic.email == email, Clinic.is_active == True).first()
+        cache_key = _login_cache_key("clinic", email, password)
+        cached = _login_cache.get(cache_key)
+        if cached is _LOGIN_MISS:
+            return None
+        
+        query = db.query(Clinic).options(load_only(*_CLINIC_LOGIN_COLUMNS))
+        if cached is not None:
+            clinic = query.filter(Clinic.id == cached, Clinic.is_active == True).first()
+            if clinic:
+                return clinic
+        
+        clinic = query.filter(Clinic.email == email, Clinic.is_active == True).first()
         if not clinic:
+            self.verify_password(password, _DUMMY_PASSWORD_HASH)
+            _login_cache[cache_key] = _LOGIN_MISS
             return None
         
         if hasattr(clinic, 'password_hash') and self.verify_password(password, clinic.password_hash):
+            _login_cache[cache_key] = clinic.id
             return clinic
+        _login_cache[cache_key] = _LOGIN_MISS
         return None
     
     def authenticate_staff(self, db: Session, email: str, password: str) -> Optional[Staff]:
         """Authenticate staff member by email and password"""
-        staff = db.query(Staff).filter(Staff.email == email, Staff.is_active == True).first()
+        cache_key = _login_cache_key("staff", email, password)
+        cached = _login_cache.get(cache_key)
+        if cached is _LOGIN_MISS:
+            return None
+        
+        query = db.query(Staff).options(load_only(*_STAFF_LOGIN_COLUMNS))
+        if cached is not None:
+            staff = query.filter(Staff.id == cached, Staff.is_active == True).first()
+            if staff:
+                return staff
+        
+        staff = query.filter(Staff.email == email, Staff.is_active == True).first()
         if not staff:
+            self.verify_password(password, _DUMMY_PASSWORD_HASH)
+            _login_cache[cache_key] = _LOGIN_MISS
             return None
         
         # Check if staff has password_hash field, if not, staff authentication is not set up
         if hasattr(staff, 'password_hash') and staff.password_hash and self.verify_password(password, staff.password_hash):
+            _login_cache[cache_key] = staff.id
             return staff
+        _login_cache[cache_key] = _LOGIN_MISS
         return None
     
     def authenticate_admin(self, db: Session, email: str, password: str) -> Optional[Admin]:
         """Authenticate admin by email and password"""
         admin = db.query(Admin).filter(Admin.email == email, Admin.is_active == True).first()
         if not admin:
+            self.verify_password(password, _DUMMY_PASSWORD_HASH)
             return None
         if hasattr(admin, 'password_hash') and self.verify_password(password, admin.password_hash):
             return admin
@@ -141,9 +258,15 @@ class AuthService:
             return user_id == clinic_id
         
         elif user_type == "staff":
-            # Staff has access if they belong to the clinic
-            staff = self.get_staff_by_id(db, user_id)
-            return staff and staff.clinic_id == clinic_id
+            # Staff has access if they are active and belong to the clinic. Checked
+            # against the database rather than the token's clinic_id claim, so a
+            # deactivated or moved staff member loses access at once; only the
+            # clinic_id column is read
+            staff_clinic_id = db.query(Staff.clinic_id).filter(
+                Staff.id == user_id,
+                Staff.is_active == True
+            ).scalar()
+            return staff_clinic_id is not None and staff_clinic_id == clinic_id
         
         return False
     
@@ -172,17 +295,19 @@ class AuthService:
     
     def register_clinic(self, db: Session, clinic_data: Dict[str, Any], password: str) -> Clinic:
         """Register a new clinic"""
-        # Check if clinic with email already exists
-        existing_clinic = db.query(Clinic).filter(Clinic.email == clinic_data.get("email")).first()
-        if existing_clinic:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Clinic with this email address already exists"
-            )
-        
-        # Check if clinic with phone already exists
-        existing_clinic_phone = db.query(Clinic).filter(Clinic.phone == clinic_data.get("phone")).first()
-        if existing_clinic_phone:
+        # Check if a clinic with this email or phone already exists, in one query;
+        # an email match is reported first, as before
+        email = clinic_data.get("email")
+        phone = clinic_data.get("phone")
+        existing = db.query(Clinic.email, Clinic.phone).filter(
+            or_(Clinic.email == email, Clinic.phone == phone)
+        ).order_by(case((Clinic.email == email, 0), else_=1)).first()
+        if existing:
+            if existing.email == email:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Clinic with this email address already exists"
+                )
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Clinic with this phone number already exists"
@@ -196,41 +321,18 @@ class AuthService:
         clinic_data["password_hash"] = hashed_password
         
         clinic = Clinic(**clinic_data)
-        # Generate OTP
-        otp = str(random.randint(100000, 999999))
-        clinic.email_verification_code = otp
+        # Generate OTP from a CSPRNG and store only its hash
+        otp = f"{randbelow(1_000_000):06d}"
+        clinic.email_verification_code = _hash_otp(otp)
         clinic.email_verified = False
         db.add(clinic)
         db.commit()
         db.refresh(clinic)
         
-        # Trigger async setup of Twilio phone number and ElevenLabs AI agent
-        # This runs in the background and won't block the registration response
+        # Set up the Twilio phone number and ElevenLabs AI agent in the background;
+        # the bounded pool keeps registration bursts from spawning a thread each
         try:
-            # Use asyncio to run setup in background
-            try:
-                loop = asyncio.get_event_loop()
-                if loop and loop.is_running():
-                    # If we're in an async context, create a task
-                    asyncio.create_task(self._setup_clinic_integrations_async(clinic, db, area_code))
-                else:
-                    # If we're in a sync context, run in thread
-                    import threading
-                    thread = threading.Thread(
-                        target=self._setup_clinic_integrations_sync,
-                        args=(clinic, db, area_code),
-                        daemon=True
-                    )
-                    thread.start()
-            except RuntimeError:
-                # No event loop available, run in thread
-                import threading
-                thread = threading.Thread(
-                    target=self._setup_clinic_integrations_sync,
-                    args=(clinic, db, area_code),
-                    daemon=True
-                )
-                thread.start()
+            _setup_executor.submit(self._setup_clinic_integrations_sync, clinic.id, area_code)
         except Exception as e:
             # Log error but don't fail registration
             import logging
@@ -239,51 +341,36 @@ class AuthService:
         
         return clinic
     
-    async def _setup_clinic_integrations_async(self, clinic: Clinic, db: Session, area_code: str = None):
-        """Async wrapper for clinic setup"""
+    async def _setup_clinic_integrations_async(self, clinic_id: int, area_code: str = None):
+        """Async clinic setup; loads the clinic by ID in its own session"""
         try:
-            # Create a new session for the background task
+            # Create a new session for the background task; its blocking queries
+            # run in threads so concurrent setups don't queue on the shared loop
             from database import SessionLocal
             setup_db = SessionLocal()
             try:
-                # Refresh the clinic object in the new session
-                clinic_in_new_session = setup_db.query(Clinic).filter(Clinic.id == clinic.id).first()
-                if clinic_in_new_session:
-                    await clinic_setup_service.setup_clinic_integrations(clinic_in_new_session, setup_db, area_code)
+                clinic = await asyncio.to_thread(
+                    lambda: setup_db.query(Clinic).filter(Clinic.id == clinic_id).first()
+                )
+                if clinic:
+                    await clinic_setup_service.setup_clinic_integrations(clinic, setup_db, area_code)
                 else:
                     import logging
                     logger = logging.getLogger(__name__)
-                    logger.error(f"Could not find clinic {clinic.id} in new session")
+                    logger.error(f"Could not find clinic {clinic_id} in new session")
             finally:
-                setup_db.close()
+                await asyncio.to_thread(setup_db.close)
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
-            logger.error(f"Async clinic setup failed for clinic {clinic.id}: {str(e)}")
+            logger.error(f"Async clinic setup failed for clinic {clinic_id}: {str(e)}")
     
-    def _setup_clinic_integrations_sync(self, clinic: Clinic, db: Session, area_code: str = None):
-        """Sync wrapper for clinic setup"""
-        try:
-            # Create a new session for the background task
-            from database import SessionLocal
-            import asyncio
-            setup_db = SessionLocal()
-            try:
-                # Refresh the clinic object in the new session
-                clinic_in_new_session = setup_db.query(Clinic).filter(Clinic.id == clinic.id).first()
-                if clinic_in_new_session:
-                    # Run the async setup in a new event loop
-                    asyncio.run(clinic_setup_service.setup_clinic_integrations(clinic_in_new_session, setup_db, area_code))
-                else:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.error(f"Could not find clinic {clinic.id} in new session")
-            finally:
-                setup_db.close()
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Sync clinic setup failed for clinic {clinic.id}: {str(e)}")
+    def _setup_clinic_integrations_sync(self, clinic_id: int, area_code: str = None):
+        """Sync wrapper for clinic setup, run on _setup_executor"""
+        # Block this worker until done, so the executor still bounds concurrent setups
+        asyncio.run_coroutine_threadsafe(
+            self._setup_clinic_integrations_async(clinic_id, area_code), _get_setup_loop()
+        ).result()
     
     def register_staff(self, db: Session, staff_data: Dict[str, Any], password: str, clinic_id: int) -> Staff:
         """Register a new staff member"""
@@ -333,13 +420,18 @@ class AuthService:
         
         user.password_hash = self.get_password_hash(new_password)
         db.commit()
+        # Drop cached login outcomes so the old password stops working immediately
+        _login_cache.clear()
         return True
 
     def verify_clinic_email(self, db: Session, clinic_id: int, otp: str) -> bool:
         clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
         if not clinic or not clinic.email_verification_code:
             return False
-        if clinic.email_verification_code == otp:
+        stored = clinic.email_verification_code
+        # Codes issued before hashing are stored as the 6-digit plaintext
+        expected = otp if len(stored) <= 10 else _hash_otp(otp)
+        if hmac.compare_digest(stored.encode(), expected.encode()):
             clinic.email_verified = True
             clinic.email_verification_code = None
             db.commit()
@@ -0,0 +1,86 @@
+"""
+Redis Cache Service
+Shared response cache for upstream ElevenLabs reads
+"""
+import os
+import logging
+from typing import Any, Optional
+from dotenv import load_dotenv
+import orjson
+import redis.asyncio as redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class CacheService:
+    """Thin JSON cache over Redis; every call is a no-op when REDIS_URL is unset"""
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL")
+        self.client = redis.from_url(self.redis_url) if self.redis_url else None
+        self.hits = 0
+        self.misses = 0
+
+    async def get_json(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for key, or None on a miss or Redis error
+        """
+        if not self.client:
+            return None
+        try:
+            raw = await self.client.get(key)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {key}: {str(e)}")
+            return None
+
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return orjson.loads(raw)
+
+    async def set_json(self, key: str, value: Any, expire: int) -> None:
+        """
+        Store value under key for expire seconds
+        """
+        if not self.client:
+            return
+        try:
+            await self.client.set(key, orjson.dumps(value), ex=expire)
+        except Exception as e:
+            logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+    async def exists(self, key: str) -> bool:
+        """
+        Return True if key is present; False on a miss, Redis error, or no Redis
+        """
+        if not self.client:
+            return False
+        try:
+            return bool(await self.client.exists(key))
+        except Exception as e:
+            logger.warning(f"Cache exists check failed for {key}: {str(e)}")
+            return False
+
+    async def set_once(self, key: str, expire: int) -> bool:
+        """
+        SETNX key for expire seconds; return True if this call created it
+        """
+        if not self.client:
+            return True
+        try:
+            return bool(await self.client.set(key, b"1", ex=expire, nx=True))
+        except Exception as e:
+            logger.warning(f"Cache setnx failed for {key}: {str(e)}")
+            return True
+
+    async def close(self) -> None:
+        """Close the Redis connection pool"""
+        if self.client:
+            await self.client.aclose()
+
+
+# Create a singleton instance
+cache_service = CacheService()
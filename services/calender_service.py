@@ -4,15 +4,19 @@ Handles appointment scheduling, availability checking, and calendar integrations
 Now supports both Google Calendar and Calendly integrations with full webhook support
 """
 
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta, time, timezone
 from typing import List, Optional, Dict, Any
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import logging
-from sqlalchemy.orm import Session
+import threading
+from cachetools import TTLCache
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
 from models import Appointment, Clinic, Patient, AppointmentStatus
-from schemas import AppointmentCreate, AppointmentUpdate, TimeSlot
+from schemas import AppointmentCreate, AppointmentUpdate
+from schemas_fast import TimeSlotFast, calendly_available_times_decoder
 import os
 from zoneinfo import ZoneInfo
 import httpx
@@ -20,11 +24,19 @@ import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Available slots per (clinic, date, duration) are reused for a minute; bookings invalidate them
+SLOT_CACHE_TTL = 60
+
+# Seconds between background pulls of Google Calendar changes
+GOOGLE_CALENDAR_PULL_INTERVAL = 300
+
 class CalendarService:
     def __init__(self):
         self.google_service = None
         self.default_timezone = "America/New_York"
         self.calendly_base_url = "https://api.calendly.com"
+        self._slot_cache = TTLCache(maxsize=1024, ttl=SLOT_CACHE_TTL)
+        self._slot_cache_lock = threading.RLock()
     
     def initialize_google_calendar(self, credentials_json: str) -> bool:
         """Initialize Google Calendar API service"""
@@ -49,8 +61,14 @@ class CalendarService:
         date: datetime.date,
         duration_minutes: int = 30,
         db: Session = None
-    ) -> List[TimeSlot]:
+    ) -> List[TimeSlotFast]:
         """Get available appointment slots for a specific date"""
+        cache_key = (clinic_id, date.isoformat(), duration_minutes)
+        with self._slot_cache_lock:
+            cached = self._slot_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
         try:
             clinic = db.query(Clinic).filter(Clinic.id == clinic_id).first()
             if not clinic:
@@ -58,21 +76,32 @@ class CalendarService:
             
             # Check if clinic has Calendly integration
             if hasattr(clinic, 'calendly_access_token') and clinic.calendly_access_token:
-                return self._get_calendly_available_slots(clinic, date, duration_minutes)
+                slots = self._get_calendly_available_slots(clinic, date, duration_minutes)
             else:
                 # Fallback to local availability calculation
-                return self._get_local_available_slots(clinic, date, duration_minutes, db)
+                slots = self._get_local_available_slots(clinic, date, duration_minutes, db)
             
         except Exception as e:
             logger.error(f"Error getting available slots: {e}")
             return []
+        
+        with self._slot_cache_lock:
+            self._slot_cache[cache_key] = tuple(slots)
+        return slots
+    
+    def invalidate_available_slots(self, clinic_id: int, *dates: datetime.date) -> None:
+        """Drop cached slots for a clinic on the given dates, for every duration"""
+        days = {day.isoformat() for day in dates}
+        with self._slot_cache_lock:
+            for key in [key for key in self._slot_cache if key[0] == clinic_id and key[1] in days]:
+                self._slot_cache.pop(key, None)
     
     def _get_calendly_available_slots(
         self,
         clinic: Clinic,
         date: datetime.date,
         duration_minutes: int
-    ) -> List[TimeSlot]:
+    ) -> List[TimeSlotFast]:
         """Get available slots from Calendly"""
         try:
             loop = asyncio.new_event_loop()
@@ -90,7 +119,7 @@ class CalendarService:
         clinic: Clinic,
         date: datetime.date,
         duration_minutes: int
-    ) -> List[TimeSlot]:
+    ) -> List[TimeSlotFast]:
         """Async method to get Calendly available slots"""
         available_slots = []
         
@@ -151,15 +180,11 @@ class CalendarService:
                 )
                 
                 if availability_response.status_code == 200:
-                    slots_data = availability_response.json().get("collection", [])
-                    for slot in slots_data:
-                        start = datetime.fromisoformat(slot["start_time"].replace("Z", "+00:00"))
-                        end = datetime.fromisoformat(slot["end_time"].replace("Z", "+00:00"))
-                        available_slots.append(TimeSlot(
-                            start_time=start,
-                            end_time=end,
-                            is_available=True
-                        ))
+                    slots_data = calendly_available_times_decoder.decode(availability_response.content)
+                    available_slots = [
+                        TimeSlotFast(start_time=slot.start_time, end_time=slot.end_time)
+                        for slot in slots_data.collection
+                    ]
                 
         except Exception as e:
             logger.error(f"Error in async Calendly slots retrieval: {e}")
@@ -172,46 +197,46 @@ class CalendarService:
         date: datetime.date,
         duration_minutes: int,
         db: Session
-    ) -> List[TimeSlot]:
+    ) -> List[TimeSlotFast]:
         """Get available slots using local database (original logic)"""
         # Default working hours (can be stored in clinic settings)
         start_hour = getattr(clinic, 'start_hour', 9)  # 9 AM
         end_hour = getattr(clinic, 'end_hour', 17)    # 5 PM
         
-        # Generate all possible slots
-        all_slots = []
+        # Generate all possible slots: every whole duration that fits in working hours
         start_time = datetime.combine(date, time(start_hour, 0))
-        end_time = datetime.combine(date, time(end_hour, 0))
-        
-        current_time = start_time
-        while current_time + timedelta(minutes=duration_minutes) <= end_time:
-            all_slots.append(current_time)
-            current_time += timedelta(minutes=duration_minutes)
+        duration = timedelta(minutes=duration_minutes)
+        slot_count = (end_hour - start_hour) * 60 // duration_minutes
+        all_slots = [start_time + duration * index for index in range(slot_count)]
         
-        # Get existing appointments for the date
-        existing_appointments = db.query(Appointment).filter(
-            Appointment.clinic_id == clinic.id,
-            Appointment.appointment_datetime >= datetime.combine(date, time.min),
-            Appointment.appointment_datetime < datetime.combine(date + timedelta(days=1), time.min),
-            Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-        ).all()
+        # Get existing appointment times for the date, sorted by the database.
+        # The half-open [day_start, day_end) range is a plain range scan on
+        # ix_appt_clinic_dt_status
+        day_start = datetime.combine(date, time.min)
+        day_end = day_start + timedelta(days=1)
+        booked_times = [
+            booked_time for (booked_time,) in db.query(Appointment.appointment_datetime).filter(
+                Appointment.clinic_id == clinic.id,
+                Appointment.appointment_datetime >= day_start,
+                Appointment.appointment_datetime < day_end,
+                Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
+            ).order_by(Appointment.appointment_datetime)
+        ]
         
-        # Remove booked slots
-        booked_times = [apt.appointment_datetime for apt in existing_appointments]
+        # Remove booked slots: a slot conflicts with a booking less than one duration
+        # away on either side. Slots and bookings are both ascending, so one sweep
+        # skips bookings that ended before each slot and checks only the next one
         available_slots = []
+        next_booked = 0
         
         for slot_time in all_slots:
-            is_available = True
-            for booked_time in booked_times:
-                if abs((slot_time - booked_time).total_seconds()) < duration_minutes * 60:
-                    is_available = False
-                    break
-            
-            if is_available:
-                available_slots.append(TimeSlot(
+            while next_booked < len(booked_times) and booked_times[next_booked] <= slot_time - duration:
+                next_booked += 1
+            
+            if next_booked == len(booked_times) or booked_times[next_booked] >= slot_time + duration:
+                available_slots.append(TimeSlotFast(
                     start_time=slot_time,
-                    end_time=slot_time + timedelta(minutes=duration_minutes),
-                    is_available=True
+                    end_time=slot_time + duration
                 ))
         
         return available_slots
@@ -229,18 +254,8 @@ class CalendarService:
                 logger.error(f"Clinic {appointment_data.clinic_id} not found")
                 return None
             
-            # Check if slot is still available
-            existing = db.query(Appointment).filter(
-                Appointment.clinic_id == appointment_data.clinic_id,
-                Appointment.appointment_datetime == appointment_data.appointment_datetime,
-                Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-            ).first()
-            
-            if existing:
-                logger.warning(f"Slot {appointment_data.appointment_datetime} already booked")
-                return None
-            
-            # Create appointment
+            # Create appointment; ux_appt_slot rejects a slot that is already booked
+            # (or taken concurrently) when the insert is committed
             appointment = Appointment(
                 clinic_id=appointment_data.clinic_id,
                 patient_id=appointment_data.patient_id,
@@ -252,8 +267,14 @@ class CalendarService:
             )
             
             db.add(appointment)
-            db.commit()
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                logger.warning(f"Slot {appointment_data.appointment_datetime} already booked")
+                return None
             db.refresh(appointment)
+            self.invalidate_available_slots(appointment.clinic_id, appointment.appointment_datetime.date())
             
             # Sync with calendar service
             if hasattr(clinic, 'calendly_access_token') and clinic.calendly_access_token:
@@ -261,7 +282,7 @@ class CalendarService:
                 self._create_calendly_booking(appointment, clinic, db)
             elif self.google_service:
                 # Sync with Google Calendar if available
-                self._sync_to_google_calendar(appointment, db)
+                self._sync_to_google_calendar(appointment, db, clinic=clinic)
             
             logger.info(f"Appointment booked: {appointment.id}")
             return appointment
@@ -327,6 +348,7 @@ class CalendarService:
                     appointment.notes = (appointment.notes or "") + f"\n[Rescheduled from {old_datetime} - requires Calendly update]"
             
             db.commit()
+            self.invalidate_available_slots(appointment.clinic_id, old_datetime.date(), new_datetime.date())
             
             # Update Google Calendar if available
             if self.google_service:
@@ -360,6 +382,7 @@ class CalendarService:
                     appointment.notes = (appointment.notes or "") + f"\n[Cancelled via system at {datetime.now()}]"
             
             db.commit()
+            self.invalidate_available_slots(appointment.clinic_id, appointment.appointment_datetime.date())
             
             # Remove from Google Calendar if available
             if self.google_service:
@@ -397,27 +420,61 @@ class CalendarService:
             logger.error(f"Error getting upcoming appointments: {e}")
             return []
     
-    def _sync_to_google_calendar(self, appointment: Appointment, db: Session):
+    def _google_event_body(
+        self,
+        appointment: Appointment,
+        clinic: Optional[Clinic],
+        patient: Optional[Patient]
+    ) -> Dict[str, Any]:
+        """Build the Google Calendar event resource for an appointment"""
+        return {
+            'summary': f'Appointment - {patient.first_name} {patient.last_name}' if patient else "Patient Appointment",
+            'description': f'Clinic: {clinic.name if clinic else "Unknown"}\nNotes: {appointment.notes or ""}',
+            'start': {
+                'dateTime': appointment.appointment_datetime.isoformat(),
+                'timeZone': self.default_timezone,
+            },
+            'end': {
+                'dateTime': (appointment.appointment_datetime + timedelta(minutes=appointment.duration_minutes)).isoformat(),
+                'timeZone': self.default_timezone,
+            },
+        }
+    
+    def _load_event_parties(
+        self,
+        appointment: Appointment,
+        db: Session,
+        clinic: Optional[Clinic] = None,
+        patient: Optional[Patient] = None
+    ) -> tuple:
+        """Return (clinic, patient) for an event, loading whichever the caller lacks in one query"""
+        missing = []
+        if clinic is None:
+            missing.append(joinedload(Appointment.clinic))
+        if patient is None:
+            missing.append(joinedload(Appointment.patient))
+        if missing:
+            loaded = db.query(Appointment).options(*missing).filter(Appointment.id == appointment.id).first()
+            if loaded:
+                clinic = clinic or loaded.clinic
+                patient = patient or loaded.patient
+        return clinic, patient
+    
+    def _sync_to_google_calendar(
+        self,
+        appointment: Appointment,
+        db: Session,
+        clinic: Optional[Clinic] = None,
+        patient: Optional[Patient] = None
+    ):
         """Sync appointment to Google Calendar"""
         try:
             if not self.google_service:
                 return
             
-            clinic = db.query(Clinic).filter(Clinic.id == appointment.clinic_id).first()
-            patient = db.query(Patient).filter(Patient.id == appointment.patient_id).first()
-            
-            event = {
-                'summary': f'Appointment - {patient.first_name} {patient.last_name}' if patient else "Patient Appointment",
-                'description': f'Clinic: {clinic.name if clinic else "Unknown"}\nNotes: {appointment.notes or ""}',
-                'start': {
-                    'dateTime': appointment.appointment_datetime.isoformat(),
-                    'timeZone': self.default_timezone,
-                },
-                'end': {
-                    'dateTime': (appointment.appointment_datetime + timedelta(minutes=appointment.duration_minutes)).isoformat(),
-                    'timeZone': self.default_timezone,
-                },
-            }
+            clinic, patient = self._load_event_parties(appointment, db, clinic, patient)
+            
+            event = self._google_event_body(appointment, clinic, patient)
             
             created_event = self.google_service.events().insert(
                 calendarId='primary', 
@@ -432,27 +489,21 @@ class CalendarService:
         except Exception as e:
             logger.error(f"Error syncing to Google Calendar: {e}")
     
-    def _update_google_calendar_event(self, appointment: Appointment, db: Session):
+    def _update_google_calendar_event(
+        self,
+        appointment: Appointment,
+        db: Session,
+        clinic: Optional[Clinic] = None,
+        patient: Optional[Patient] = None
+    ):
         """Update Google Calendar event"""
         try:
             if not self.google_service or not appointment.external_id or appointment.external_system != "google":
                 return
             
-            clinic = db.query(Clinic).filter(Clinic.id == appointment.clinic_id).first()
-            patient = db.query(Patient).filter(Patient.id == appointment.patient_id).first()
-            
-            event = {
-                'summary': f'Appointment - {patient.first_name} {patient.last_name}' if patient else "Patient Appointment",
-                'description': f'Clinic: {clinic.name if clinic else "Unknown"}\nNotes: {appointment.notes or ""}',
-                'start': {
-                    'dateTime': appointment.appointment_datetime.isoformat(),
-                    'timeZone': self.default_timezone,
-                },
-                'end': {
-                    'dateTime': (appointment.appointment_datetime + timedelta(minutes=appointment.duration_minutes)).isoformat(),
-                    'timeZone': self.default_timezone,
-                },
-            }
+            clinic, patient = self._load_event_parties(appointment, db, clinic, patient)
+            
+            event = self._google_event_body(appointment, clinic, patient)
             
             self.google_service.events().update(
                 calendarId='primary',
@@ -476,6 +527,139 @@ class CalendarService:
             
         except Exception as e:
             logger.error(f"Error deleting Google Calendar event: {e}")
+    
+    def _list_google_calendar_changes(self, sync_token: Optional[str]) -> tuple:
+        """
+        Page through events.list and return (items, next_sync_token)
+        
+        With a sync token only events changed since that token are returned,
+        including cancelled ones; without one, upcoming events are listed in full.
+        """
+        if sync_token:
+            params = {'syncToken': sync_token}
+        else:
+            params = {'timeMin': datetime.now(timezone.utc).isoformat(), 'singleEvents': True}
+        
+        items = []
+        page_token = None
+        while True:
+            response = self.google_service.events().list(
+                calendarId='primary',
+                pageToken=page_token,
+                **params
+            ).execute()
+            items.extend(response.get('items', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return items, response.get('nextSyncToken')
+    
+    def pull_google_calendar_changes(self, clinic_id: int, db: Session) -> int:
+        """
+        Apply Google Calendar changes to the clinic's Google-linked appointments
+        
+        The first pull for a clinic lists upcoming events and stores the
+        nextSyncToken on the clinic row, so restarts and other workers resume
+        from it; later pulls fetch only the delta. Events cancelled in Google
+        cancel their appointment and moved events update its time.
+        Returns the number of appointments changed.
+        """
+        if not self.google_service:
+            return 0
+        
+        try:
+            sync_token = db.query(Clinic.google_calendar_sync_token).filter(Clinic.id == clinic_id).scalar()
+            try:
+                items, next_sync_token = self._list_google_calendar_changes(sync_token)
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                # The sync token expired; fall back to a full listing
+                logger.info(f"Google Calendar sync token expired for clinic {clinic_id}, running full sync")
+                items, next_sync_token = self._list_google_calendar_changes(None)
+            
+            events = {item['id']: item for item in items}
+            appointments = db.query(Appointment).filter(
+                Appointment.clinic_id == clinic_id,
+                Appointment.external_system == "google",
+                Appointment.external_id.in_(events)
+            ).all() if events else []
+            
+            local_timezone = ZoneInfo(self.default_timezone)
+            changed = 0
+            changed_dates = set()
+            for appointment in appointments:
+                event = events[appointment.external_id]
+                if event.get('status') == 'cancelled':
+                    if appointment.status != AppointmentStatus.CANCELLED:
+                        appointment.status = AppointmentStatus.CANCELLED
+                        changed_dates.add(appointment.appointment_datetime.date())
+                        changed += 1
+                    continue
+                
+                start = event.get('start', {}).get('dateTime')
+                if not start:
+                    continue
+                # Appointments are stored as naive local times in the default timezone
+                start_time = datetime.fromisoformat(start).astimezone(local_timezone).replace(tzinfo=None)
+                if start_time != appointment.appointment_datetime:
+                    old_date = appointment.appointment_datetime.date()
+                    try:
+                        # A move onto a slot that is already booked trips ux_appt_slot;
+                        # skip that one event rather than failing the whole pull
+                        with db.begin_nested():
+                            appointment.appointment_datetime = start_time
+                    except IntegrityError:
+                        logger.warning(f"Google Calendar moved appointment {appointment.id} onto a booked slot {start_time}; skipped")
+                        continue
+                    changed_dates.update((old_date, start_time.date()))
+                    changed += 1
+            
+            if next_sync_token:
+                db.query(Clinic).filter(Clinic.id == clinic_id).update(
+                    {Clinic.google_calendar_sync_token: next_sync_token},
+                    synchronize_session=False
+                )
+            db.commit()
+            if changed:
+                self.invalidate_available_slots(clinic_id, *changed_dates)
+            
+            logger.info(f"Pulled {len(items)} Google Calendar changes for clinic {clinic_id}, {changed} appointments updated")
+            return changed
+            
+        except Exception as e:
+            logger.error(f"Error pulling Google Calendar changes: {e}")
+            db.rollback()
+            return 0
+    
+    def _pull_google_calendar_changes_for_all(self):
+        """Pull changes for every clinic with Google-linked appointments, in a session of its own"""
+        from database import SessionLocal
+        db = SessionLocal()
+        try:
+            clinic_ids = [
+                clinic_id for (clinic_id,) in db.query(Appointment.clinic_id).filter(
+                    Appointment.external_system == "google"
+                ).distinct()
+            ]
+            for clinic_id in clinic_ids:
+                self.pull_google_calendar_changes(clinic_id, db)
+        finally:
+            db.close()
+    
+    async def run_google_calendar_pull(self):
+        """
+        Background loop started from the app lifespan; pulls Google Calendar
+        changes every GOOGLE_CALENDAR_PULL_INTERVAL seconds once the Google
+        service is initialized. The Google client and the session are blocking,
+        so each round runs in a worker thread
+        """
+        while True:
+            if self.google_service:
+                try:
+                    await asyncio.to_thread(self._pull_google_calendar_changes_for_all)
+                except Exception as e:
+                    logger.warning(f"Google Calendar pull failed: {e}")
+            await asyncio.sleep(GOOGLE_CALENDAR_PULL_INTERVAL)
 
 # Global instance
 calendar_service = CalendarService()
\ No newline at end of file
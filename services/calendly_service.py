@@ -10,6 +10,7 @@ import hashlib
 import hmac
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 import json
@@ -395,6 +396,52 @@ class CalendlyService:
         
         return notes.strip()
     
+    def _add_calendly_appointment(self, db: Session, appointment) -> Optional[Any]:
+        """
+        Add a Calendly appointment, or merge it into the active booking that holds its slot
+        
+        A clinic holds one active appointment per start time (ux_appt_slot). A local
+        booking pending Calendly confirmation is confirmed and linked to the event;
+        a slot already linked to a different Calendly event is a conflict and None
+        is returned. Nothing is committed.
+        """
+        from models import Appointment, AppointmentStatus
+        
+        slot_query = db.query(Appointment).filter(
+            Appointment.clinic_id == appointment.clinic_id,
+            Appointment.appointment_datetime == appointment.appointment_datetime,
+            Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
+        )
+        
+        existing = slot_query.first()
+        if existing is None:
+            try:
+                with db.begin_nested():
+                    db.add(appointment)
+                return appointment
+            except IntegrityError:
+                # Another booking took the slot between the lookup and the insert
+                existing = slot_query.first()
+                if existing is None:
+                    raise
+        
+        if existing.calendly_event_uri and existing.calendly_event_uri != appointment.calendly_event_uri:
+            logger.warning(
+                f"Slot {appointment.appointment_datetime} for clinic {appointment.clinic_id} is already held by "
+                f"Calendly event {existing.calendly_event_uri}; skipping {appointment.calendly_event_uri}"
+            )
+            return None
+        
+        existing.status = AppointmentStatus.CONFIRMED
+        existing.external_id = appointment.external_id
+        existing.external_system = "calendly"
+        existing.calendly_event_uri = appointment.calendly_event_uri
+        existing.calendly_invitee_uri = appointment.calendly_invitee_uri or existing.calendly_invitee_uri
+        existing.confirmed_at = appointment.confirmed_at or existing.confirmed_at
+        existing.confirmation_method = appointment.confirmation_method or existing.confirmation_method
+        logger.info(f"Linked Calendly event {appointment.calendly_event_uri} to appointment {existing.id}")
+        return existing
+    
     async def handle_appointment_booking(
         self,
         db: Session,
@@ -477,7 +524,10 @@ class CalendlyService:
                 confirmation_method="calendly"
             )
             
-            db.add(appointment)
+            appointment = self._add_calendly_appointment(db, appointment)
+            if appointment is None:
+                db.rollback()
+                return None
             db.commit()
             db.refresh(appointment)
             
@@ -664,13 +714,16 @@ class CalendlyService:
                             notes=f"Calendly event: {event.get('name', 'N/A')}\nSynced from Calendly"
                         )
                         
-                        db.add(appointment)
+                        if self._add_calendly_appointment(db, appointment) is None:
+                            errors += 1
+                            continue
                         synced += 1
                     else:
-                        # Update existing appointment
-                        existing.appointment_datetime = start_time
-                        existing.duration_minutes = duration
-                        existing.status = AppointmentStatus.CONFIRMED
+                        # Update existing appointment; a savepoint keeps a slot clash from failing the whole sync
+                        with db.begin_nested():
+                            existing.appointment_datetime = start_time
+                            existing.duration_minutes = duration
+                            existing.status = AppointmentStatus.CONFIRMED
                         synced += 1
                         
                 except Exception as e:
@@ -1,5 +1,6 @@
+import asyncio
 import httpx
-from typing import List, Optional, Dict, Any
+from typing import Iterator, List, Optional, Dict, Any
 from datetime import datetime
 import logging
 import os
@@ -13,9 +14,12 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Most conversations synced together when webhooks arrive in a burst
+SYNC_BATCH_SIZE = 50
+
 
 class ConversationService:
-    def __init__(self):
+    def __init__(self, http_client: Optional[httpx.AsyncClient] = None):
         self.api_key = os.getenv("ELEVENLABS_API_KEY")
         self.base_url = "https://api.elevenlabs.io/v1/convai/conversations"
         self.agents_base_url = "https://api.elevenlabs.io/v1/convai/agents"
@@ -23,6 +27,31 @@ class ConversationService:
             "xi-api-key": self.api_key,
             "Content-Type": "application/json"
         }
+        self._client = http_client
+        self._owns_client = False
+        self._sync_queue: asyncio.Queue = asyncio.Queue()
+    
+    def set_http_client(self, http_client: httpx.AsyncClient):
+        """
+        Use an application-owned client (created in the FastAPI lifespan) for all ElevenLabs calls
+        """
+        self._client = http_client
+        self._owns_client = False
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Shared client so repeated ElevenLabs calls reuse pooled keep-alive connections"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            )
+            self._owns_client = True
+        return self._client
+    
+    async def aclose(self):
+        """Close the HTTP client if this service created it"""
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+        self._client = None
     
     async def get_conversations_by_agent(self, agent_id: str, limit: int = 50, page: int = 1, cursor: str = None) -> Dict[str, Any]:
         """
@@ -42,14 +71,14 @@ class ConversationService:
                 params["cursor"] = cursor
             
             # Fetch conversations from ElevenLabs
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    self.base_url,
-                    headers=self.headers,
-                    params=params
-                )
-                response.raise_for_status()
-                elevenlabs_data = response.json()
+            client = self._get_client()
+            response = await client.get(
+                self.base_url,
+                headers=self.headers,
+                params=params
+            )
+            response.raise_for_status()
+            elevenlabs_data = response.json()
             
             logger.info(f"ElevenLabs returned {len(elevenlabs_data.get('conversations', []))} conversations")
             
@@ -140,13 +169,12 @@ class ConversationService:
         Get detailed information about a specific conversation
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/{conversation_id}",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
+            response = await self._get_client().get(
+                f"{self.base_url}/{conversation_id}",
+                headers=self.headers
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error fetching conversation {conversation_id}: {e.response.status_code}")
             raise
@@ -170,14 +198,14 @@ class ConversationService:
             if cursor:
                 params["cursor"] = cursor
             
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    self.base_url,
-                    headers=self.headers,
-                    params=params
-                )
-                response.raise_for_status()
-                elevenlabs_data = response.json()
+            client = self._get_client()
+            response = await client.get(
+                self.base_url,
+                headers=self.headers,
+                params=params
+            )
+            response.raise_for_status()
+            elevenlabs_data = response.json()
             
             logger.info(f"Successfully fetched {len(elevenlabs_data.get('conversations', []))} conversations")
             
@@ -205,13 +233,13 @@ class ConversationService:
         Get agent details from ElevenLabs
         """
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.agents_base_url}/{agent_id}",
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
+            client = self._get_client()
+            response = await client.get(
+                f"{self.agents_base_url}/{agent_id}",
+                headers=self.headers
+            )
+            response.raise_for_status()
+            return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error fetching agent {agent_id}: {e.response.status_code}")
             raise
@@ -219,24 +247,33 @@ class ConversationService:
             logger.error(f"Error fetching agent {agent_id}: {str(e)}")
             raise
     
+    def format_transcript_entry(self, entry: Dict[str, Any]) -> str:
+        """
+        Format a single transcript turn as "[mm:ss] ROLE: message"
+        """
+        role = entry.get("role", "unknown").upper()
+        message = entry.get("message", "")
+        time_in_call = entry.get("time_in_call_secs", 0)
+        
+        # Format time as mm:ss
+        minutes = int(time_in_call // 60)
+        seconds = int(time_in_call % 60)
+        time_str = f"{minutes:02d}:{seconds:02d}"
+        
+        return f"[{time_str}] {role}: {message}"
+    
+    def iter_transcript_lines(self, transcript_data: List[Dict[str, Any]]) -> Iterator[str]:
+        """
+        Yield formatted transcript lines one turn at a time
+        """
+        for entry in transcript_data:
+            yield self.format_transcript_entry(entry)
+    
     def format_transcript(self, transcript_data: List[Dict[str, Any]]) -> str:
         """
         Format transcript data into a readable string
         """
-        formatted_lines = []
-        for entry in transcript_data:
-            role = entry.get("role", "unknown").upper()
-            message = entry.get("message", "")
-            time_in_call = entry.get("time_in_call_secs", 0)
-            
-            # Format time as mm:ss
-            minutes = int(time_in_call // 60)
-            seconds = int(time_in_call % 60)
-            time_str = f"{minutes:02d}:{seconds:02d}"
-            
-            formatted_lines.append(f"[{time_str}] {role}: {message}")
-        
-        return "\n".join(formatted_lines)
+        return "\n".join(self.iter_transcript_lines(transcript_data))
     
     def store_conversation_id(self, call_id: int, conversation_id: str) -> bool:
         """
@@ -300,6 +337,43 @@ class ConversationService:
             logger.error(f"Error syncing conversation {conversation_id}: {str(e)}")
             raise
 
+    
+    def enqueue_sync(self, conversation_id: str):
+        """
+        Queue a conversation for syncing by the background worker
+        """
+        self._sync_queue.put_nowait(conversation_id)
+    
+    async def sync_many(self, conversation_ids: List[str]):
+        """
+        Sync a batch of conversations concurrently over the shared client
+        """
+        unique_ids = list(dict.fromkeys(conversation_ids))
+        results = await asyncio.gather(
+            *(self.sync_conversation_details(conversation_id) for conversation_id in unique_ids),
+            return_exceptions=True
+        )
+        for conversation_id, result in zip(unique_ids, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error syncing conversation details for {conversation_id}: {str(result)}")
+    
+    async def run_sync_worker(self):
+        """
+        Drain the sync queue, collecting whatever is already waiting (up to
+        SYNC_BATCH_SIZE) into one batch so bursts of webhooks share a round of requests
+        """
+        while True:
+            conversation_ids = [await self._sync_queue.get()]
+            while len(conversation_ids) < SYNC_BATCH_SIZE and not self._sync_queue.empty():
+                conversation_ids.append(self._sync_queue.get_nowait())
+            try:
+                await self.sync_many(conversation_ids)
+            except Exception as e:
+                logger.error(f"Conversation sync batch failed: {str(e)}")
+            finally:
+                for _ in conversation_ids:
+                    self._sync_queue.task_done()
+
 
 # Create a singleton instance
 conversation_service = ConversationService()
\ No newline at end of file
@@ -2,6 +2,7 @@
 Clinic Setup Service for Clinic AI Assistant
 Handles the complete setup process for new clinics including Twilio and ElevenLabs integration
 """
+import asyncio
 import logging
 import os
 import requests
@@ -45,14 +46,14 @@ class ClinicSetupService:
             "integration_setup": {"success": False, "error": None, "data": None}
         }
         
-        # Step 1: Purchase Twilio phone number
-        logger.info(f"Setting up Twilio phone number for clinic {clinic.id}")
-        twilio_result = self._setup_twilio_phone(clinic, area_code)
+        # Steps 1 and 2 are independent blocking calls, so run them side by side:
+        # purchase the Twilio phone number and create the ElevenLabs AI agent
+        logger.info(f"Setting up Twilio phone number and ElevenLabs AI agent for clinic {clinic.id}")
+        twilio_result, elevenlabs_result = await asyncio.gather(
+            asyncio.to_thread(self._setup_twilio_phone, clinic, area_code),
+            asyncio.to_thread(self._setup_elevenlabs_agent, clinic)
+        )
         setup_results["twilio_setup"] = twilio_result
-        
-        # Step 2: Create ElevenLabs AI agent
-        logger.info(f"Setting up ElevenLabs AI agent for clinic {clinic.id}")
-        elevenlabs_result = self._setup_elevenlabs_agent(clinic)
         setup_results["elevenlabs_setup"] = elevenlabs_result
         
         # Step 3: Link Twilio phone to ElevenLabs agent (if both succeeded)
@@ -71,10 +72,11 @@ class ClinicSetupService:
                 # Get phone_number_id from ElevenLabs
                 phone_id = await agent_setup_service._get_elevenlabs_phone_id(phone_number)
                 if phone_id:
-                    agent_setup_service.assign_phone_to_agent(agent_id, phone_id)
+                    setup_results["elevenlabs_phone_id"] = phone_id
+                    await asyncio.to_thread(agent_setup_service.assign_phone_to_agent, agent_id, phone_id)
         
-        # Step 4: Update clinic record with setup information
-        self._update_clinic_record(clinic, setup_results, db)
+        # Step 4: Update clinic record with setup information (a blocking commit)
+        await asyncio.to_thread(self._update_clinic_record, clinic, setup_results, db)
         
         return setup_results
     
@@ -195,7 +197,8 @@ class ClinicSetupService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = await asyncio.to_thread(
+                requests.post,
                 f"{self.elevenlabs_base_url}/v1/convai/phone-numbers",
                 json=phone_data,
                 headers=headers
@@ -288,8 +291,16 @@ class ClinicSetupService:
             if setup_results["twilio_setup"]["success"]:
                 twilio_data = setup_results["twilio_setup"]["data"]
                 clinic.twilio_phone_sid = twilio_data["sid"]
+                # A stored ElevenLabs phone ID belongs to the old number; drop it so
+                # outbound calls never dial through a number the clinic no longer has
+                if clinic.twilio_phone_number != twilio_data["phone_number"]:
+                    clinic.elevenlabs_phone_id = None
                 clinic.twilio_phone_number = twilio_data["phone_number"]
             
+            # The ElevenLabs phone ID resolved during setup is for the number just stored
+            if setup_results.get("elevenlabs_phone_id"):
+                clinic.elevenlabs_phone_id = setup_results["elevenlabs_phone_id"]
+            
             # Update ElevenLabs agent information
             if setup_results["elevenlabs_setup"]["success"]:
                 elevenlabs_data = setup_results["elevenlabs_setup"]["data"]
@@ -306,6 +317,7 @@ class ClinicSetupService:
             clinic.setup_results = setup_results
             
             db.commit()
+            agent_setup_service.invalidate_clinic(clinic.id)
             logger.info(f"Updated clinic {clinic.id} record with setup information")
             
         except Exception as e: